@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+
+
+import asyncio
+import logging
+from typing import Dict, List, Set, Tuple, Iterable, AsyncIterator, Optional, Any
+import aiohttp
+from crawler import Method
+
+
+logger = logging.getLogger()
+
+
+class AsyncCrawler():
+    def __init__(self, method, headers, timeout, encoding=None, max_connections_per_host: int = 8, max_connections: int = 1000) -> None:
+        self.method = method
+        self.timeout = timeout
+        self.headers = headers
+        self.encoding = encoding
+        # 전체 동시 연결 수와 host별 동시 연결 수 제한 (TCPConnector가 host와 포트별로 연결 수를 제한함)
+        self.max_connections_per_host = max_connections_per_host
+        self.max_connections = max_connections
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> "AsyncCrawler":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def get_session(self) -> aiohttp.ClientSession:
+        # 세션은 이벤트 루프 안에서 만들어야 하므로 최초 요청 시점에 생성
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.max_connections_per_host)
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def make_request(self, url) -> Any:
+        session = self.get_session()
+        if self.method == Method.GET:
+            method = "GET"
+        elif self.method == Method.HEAD:
+            method = "HEAD"
+        elif self.method == Method.POST:
+            method = "POST"
+        async with session.request(method, url, headers=self.headers) as response:
+            if response.status == 200:
+                if self.encoding:
+                    return await response.text(encoding=self.encoding)
+                return await response.text(encoding='utf-8')
+        return None
+
+    async def run(self, url) -> Optional[str]:
+        response = None
+        try:
+            response = await self.make_request(url)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning("can't get response from '%s', %r", url, e)
+            return None
+        if not response:
+            logger.warning("can't get response from '%s'", url)
+        return response
+
+    async def run_many(self, urls: Iterable[str], max_in_flight: Optional[int] = None) -> AsyncIterator[Tuple[str, Optional[str]]]:
+        # 완료되는 순서대로 (url, 응답) 쌍을 반환하며, 동시에 진행 중인 요청 수를 제한함
+        if not max_in_flight:
+            max_in_flight = self.max_connections
+        url_iter = iter(urls)
+        pending: Set[asyncio.Task] = set()
+        task_url_map: Dict[asyncio.Task, str] = {}
+
+        def schedule_next() -> bool:
+            for url in url_iter:
+                task = asyncio.ensure_future(self.run(url))
+                pending.add(task)
+                task_url_map[task] = url
+                return True
+            return False
+
+        try:
+            while len(pending) < max_in_flight and schedule_next():
+                pass
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    pending.discard(task)
+                    yield task_url_map.pop(task), task.result()
+                while len(pending) < max_in_flight and schedule_next():
+                    pass
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,500 @@
+#!/usr/bin/env python
+
+
+import os
+import sys
+import re
+import json
+import time
+import platform
+import tempfile
+import threading
+import glob
+import subprocess
+import getopt
+import timeit
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+from typing import Dict, List, Callable, Optional, Any
+import xmltodict
+
+from search_extractor import SearchResultExtractor
+from extract_element import extract_element, extract_with_soup
+from lxml_extractor import LxmlExtractor
+from sanitizer import Sanitizer
+from util import IO, HTMLExtractor, Config, CollectionConfig, get_collection_config, init_logging
+from workbook_io import iter_rows
+from excel_crawling import read_excel_file
+from isbn_plan import normalize_isbn, make_isbn_plan
+
+
+def load_fixtures(pattern: str = "test.*.html") -> Dict[str, str]:
+    fixtures: Dict[str, str] = {}
+    for file in sorted(glob.glob(pattern)):
+        fixtures[file] = IO.read_file(file)
+    return fixtures
+
+
+def measure(func: Callable[[], Any], number: int, repeat: int = 5) -> float:
+    # 여러 번 반복한 결과 중 가장 빠른 회당 수행 시간(초)
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def get_fixture_bid(file: str) -> str:
+    # 'test.4.html' => '4'
+    return os.path.basename(file).split(".")[1]
+
+
+class FixtureServer:
+    # 저장된 상세 페이지로 검색 결과 페이지와 상세 페이지를 흉내내는 로컬 HTTP 서버
+    def __init__(self, fixtures: Dict[str, str], isbn_list: List[str], latency: float = 0.0) -> None:
+        self.pages = {get_fixture_bid(file): html for file, html in fixtures.items()}
+        # 워크북의 ISBN을 순서대로 저장된 페이지에 대응시킴
+        bid_list = sorted(self.pages, key=int)
+        self.isbn_bids = {isbn: bid_list[i % len(bid_list)] for i, isbn in enumerate(isbn_list)}
+        self.latency = latency
+        self.num_requests = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self.server.daemon_threads = True
+        self.url = "http://127.0.0.1:%d" % self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self) -> "FixtureServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def get_page(self, path: str, query: Dict[str, List[str]]) -> Optional[str]:
+        if path.startswith("/search"):
+            bid = self.isbn_bids.get(query.get("query", [""])[0])
+            if bid is None:
+                # 검색 결과가 없는 페이지
+                return next(iter(self.pages.values()))
+            return make_search_page(self.pages[bid], "%s/bookdb/book_detail.nhn?bid=%s" % (self.url, bid))
+        if path.startswith("/bookdb"):
+            return self.pages.get(query.get("bid", [""])[0])
+        return None
+
+    def _make_handler(self):
+        fixture_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # 연결을 재사용할 수 있도록 HTTP/1.1로 응답함
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def handle(self) -> None:
+                # 검색 단계는 첫번째 결과를 찾으면 나머지 본문을 받지 않고 연결을 닫으므로, 끊긴 연결은 오류로 출력하지 않음
+                try:
+                    super().handle()
+                except (ConnectionResetError, BrokenPipeError):
+                    pass
+
+            def do_GET(self) -> None:
+                fixture_server.num_requests += 1
+                if fixture_server.latency > 0:
+                    time.sleep(fixture_server.latency)
+                url = urlsplit(self.path)
+                page = fixture_server.get_page(url.path, parse_qs(url.query))
+                status = 200 if page is not None else 404
+                body = (page if page is not None else "not found").encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+def make_benchmark_config(conf_file: str, work_dir: str, server_url: str) -> str:
+    # 로컬 서버를 크롤링하도록 바꾼 설정 파일을 만듦 (캐시와 요청 속도 제한은 끔)
+    with open(conf_file, "r") as f:
+        conf = xmltodict.parse(f.read())
+    collection = conf["configuration"]["collection"]
+    collection["url_prefix"] = server_url + "/search?query="
+    collection["search_link_pattern"] = '<a href="(?P<url>%s/bookdb/[^"]+)"' % re.escape(server_url)
+    for name in ("cache", "rate_limit"):
+        if name in conf["configuration"]:
+            conf["configuration"][name]["enable"] = "false"
+    benchmark_conf_file = os.path.join(work_dir, "conf.xml")
+    with open(benchmark_conf_file, "w") as f:
+        f.write(xmltodict.unparse(conf, pretty=True))
+    return benchmark_conf_file
+
+
+def get_isbn_list(excel_file: str) -> List[str]:
+    return list(make_isbn_plan(iter_rows(excel_file)).get_isbn_index())
+
+
+def legacy_convert_isbn(isbn: str) -> str:
+    # 예전 read_excel_file()이 행마다 호출하던 ISBN 변환 (체크 숫자는 검사하지 않음)
+    isbn = isbn.strip()
+    isbn = re.sub(r'\.0$', '', isbn)
+    isbn = re.sub(r'-', '', isbn)
+    m = re.search(r'(?P<isbn>[0-9]{13,})', isbn)
+    if not m:
+        raise ValueError
+    return m.group("isbn")
+
+
+def legacy_isbn_scan(value_list: List[Any]) -> Dict[str, List[int]]:
+    isbn_index: Dict[str, List[int]] = {}
+    for row_num, value in enumerate(value_list):
+        try:
+            isbn_index.setdefault(legacy_convert_isbn(str(value)), []).append(row_num)
+        except ValueError:
+            continue
+    return isbn_index
+
+
+def bench_isbn_plan(number: int) -> Dict[str, Any]:
+    case_list = {
+        "float": 9791189825881.0,
+        "hyphen": "979-11-6371-669-3",
+        "invalid": "고객사 상품 코드",
+    }
+    result: Dict[str, Any] = {}
+    for name, value in case_list.items():
+        def run() -> None:
+            try:
+                legacy_convert_isbn(str(value))
+            except ValueError:
+                pass
+        result[name] = {"legacy": measure(run, number * 100), "plan": measure(lambda: normalize_isbn(value), number * 100)}
+
+    # 머리글과 잘못된 체크 숫자가 섞여 있고 같은 ISBN이 반복되는 10000행짜리 ISBN 열
+    value_list: List[Any] = ["고객사 상품코드", ""]
+    for i in range(10000):
+        isbn = "979%09d" % (i % 2000)
+        value_list.append(float(isbn + str((10 - sum(int(d) * (3 if j % 2 else 1) for j, d in enumerate(isbn)) % 10) % 10)) if i % 50 else isbn + "0")
+    rows = [(row_num, [value]) for row_num, value in enumerate(value_list)]
+    plan = make_isbn_plan(rows)
+    if set(plan.get_isbn_index()) - set(legacy_isbn_scan(value_list)) or len(plan.skip_reason_by_row) <= 2:
+        raise RuntimeError("ISBN plan result mismatch")
+    result["sheet x10000"] = {"legacy": measure(lambda: legacy_isbn_scan(value_list), max(1, number // 10)), "plan": measure(lambda: make_isbn_plan(rows), max(1, number // 10))}
+    return result
+
+
+def bench_extract_element(fixtures: Dict[str, str], number: int) -> Dict[str, Any]:
+    result: Dict[str, Any] = {}
+    for file, html in fixtures.items():
+        if not extract_element(html):
+            raise RuntimeError("nothing extracted, file=%s" % file)
+        result[file] = {"extract_element": measure(lambda: extract_element(html), number)}
+    return result
+
+
+def bench_config_loading(conf_file: str, number: int) -> Dict[str, Any]:
+    get_collection_config()
+    return {
+        "conf.xml": {
+            "Config": measure(lambda: Config(conf_file), number),
+            "CollectionConfig": measure(lambda: CollectionConfig.from_config(Config(conf_file)), number),
+            "cached": measure(get_collection_config, number * 100),
+        }
+    }
+
+
+def bench_startup(repeat: int) -> Dict[str, Any]:
+    # 새 인터프리터에서 모듈을 읽어들이고 도움말을 출력하기까지의 시간 (인터프리터 자체의 시작 시간 포함)
+    case_list = {
+        "python": ["-c", "pass"],
+        "import": ["-c", "import excel_crawling"],
+        "excel_crawling -h": ["excel_crawling.py", "-h"],
+        "crawl_service -h": ["crawl_service.py", "-h"],
+    }
+    result: Dict[str, Any] = {}
+    for name, args in case_list.items():
+        elapsed_list = []
+        for _ in range(repeat):
+            started_at = time.perf_counter()
+            subprocess.run([sys.executable] + args, check=True, stdout=subprocess.DEVNULL)
+            elapsed_list.append(time.perf_counter() - started_at)
+        result[name] = {"startup": min(elapsed_list)}
+    return result
+
+
+def bench_end_to_end(excel_file: str, work_dir: str, server: FixtureServer, repeat: int) -> Dict[str, Any]:
+    new_excel_file = os.path.join(work_dir, "new_" + os.path.basename(excel_file))
+    case_list = {
+        "workers=1": (1, 0),
+        "workers=4": (4, 0),
+        "workers=4,extract=2": (4, 2),
+    }
+    result: Dict[str, Any] = {}
+    for name, (num_workers, num_extract_workers) in case_list.items():
+        num_requests = server.num_requests
+        elapsed = measure(lambda: read_excel_file(excel_file, num_workers, new_excel_file=new_excel_file, num_extract_workers=num_extract_workers), 1, repeat)
+        if server.num_requests == num_requests:
+            raise RuntimeError("no request was sent to the fixture server, case=%s" % name)
+        num_descriptions = sum(1 for _, row in iter_rows(new_excel_file) if len(row) > 28 and row[28])
+        if num_descriptions < len(server.isbn_bids):
+            raise RuntimeError("only %d of %d descriptions were crawled, case=%s" % (num_descriptions, len(server.isbn_bids), name))
+        result[name] = {"read_excel_file": elapsed}
+    return result
+
+
+def make_search_page(html: str, link_url: str) -> str:
+    # 저장된 페이지의 중간에 검색 결과 목록을 끼워 넣어 검색 결과 페이지를 흉내냄
+    lines = html.split("\n")
+    middle = len(lines) // 2
+    result_list = ['<ul class="basic" id="searchBiblioList">', '<li><a href="%s" class="N=a:bls.title">title</a></li>' % link_url, '</ul>']
+    return "\n".join(lines[:middle] + result_list + lines[middle:])
+
+
+def legacy_search_scan(html: str) -> Optional[str]:
+    # 예전 read_excel_file()의 줄 단위 검색 루프
+    state = 0
+    for line in html.split('\n'):
+        if state == 0:
+            m = re.search(r'<ul class="basic" id="searchBiblioList"', line)
+            if m:
+                state = 1
+        elif state == 1:
+            m = re.search(r'<a href="(?P<url>http://book.naver.com/[^"]+)"', line)
+            if m:
+                return m.group("url")
+    return None
+
+
+def bench_search_scan(fixtures: Dict[str, str], number: int) -> Dict[str, Any]:
+    extractor = SearchResultExtractor()
+    link_url = "http://book.naver.com/bookdb/book_detail.nhn?bid=15662206"
+    result: Dict[str, Any] = {}
+    for file, html in fixtures.items():
+        for case, page in (("hit", make_search_page(html, link_url)), ("miss", html)):
+            expected = link_url if case == "hit" else None
+            # 응답을 8KB 조각으로 받는 경우
+            chunk_list = [page[i:i + 8192] for i in range(0, len(page), 8192)]
+            if legacy_search_scan(page) != expected or extractor.extract_first_link(page) != expected or extractor.extract_first_link_from_chunks(chunk_list) != expected:
+                raise RuntimeError("search scan result mismatch, file=%s, case=%s" % (file, case))
+            result["%s:%s" % (file, case)] = {
+                "legacy": measure(lambda: legacy_search_scan(page), number),
+                "extractor": measure(lambda: extractor.extract_first_link(page), number),
+                "stream": measure(lambda: extractor.extract_first_link_from_chunks(chunk_list), number),
+            }
+    return result
+
+
+def legacy_sanitize(html: str) -> str:
+    # 예전 extract_element()의 정리 단계 (re.LOCALE이 count 자리에 들어가 제어 문자는 앞의 4개만 지움)
+    html = re.sub(r'alt="(.*)<br>(.*)"', r'alt="\1 \2"', html)
+    html = re.sub(r'<br>', r'<br/>', html)
+    html = re.sub(r'[\x01\x08]', '', html, re.LOCALE)
+    html = re.sub(r'<\?xml[^>]+>', r'', html)
+    return html
+
+
+def bench_sanitize(fixtures: Dict[str, str], number: int) -> Dict[str, Any]:
+    sanitizer = Sanitizer()
+    case_list = dict(fixtures)
+    # 저장된 페이지를 모두 이어 붙인 큰 페이지
+    case_list["large page"] = "\n".join(fixtures.values()) * 4
+    # alt 속성이 많고 뒤에 <br>이 없는 긴 한 줄 (예전 패턴이 줄 길이의 제곱에 비례해서 역추적함)
+    case_list["long line"] = '<img alt="cover" src="cover.jpg">' * 500 + '<br>\n' + '<img alt="a<br>b">'
+    # <br>이 많고 alt=" 뒤에 "가 없는 긴 한 줄 (예전 패턴이 <br>마다 줄 끝까지 역추적함)
+    case_list["br line"] = '<img alt="' + 'x<br>' * 2000 + '\n' + '<img alt="a<br>b">'
+    result: Dict[str, Any] = {}
+    for name, html in case_list.items():
+        if sanitizer.sanitize(html) != legacy_sanitize(html):
+            raise RuntimeError("sanitize result mismatch, case=%s" % name)
+        result[name] = {
+            "legacy": measure(lambda: legacy_sanitize(html), number),
+            "sanitizer": measure(lambda: sanitizer.sanitize(html), number),
+        }
+    return result
+
+
+def bench_parser_engine(fixtures: Dict[str, str], number: int) -> Dict[str, Any]:
+    element_list = {"element_class": "book_info", "element_id": "tableOfContentsContent"}
+    lxml_extractor = LxmlExtractor(element_list)
+    # element_path는 측정하지 않고 결과가 같은지만 확인함
+    path_extractor_list = [({"element_path": path_str}, LxmlExtractor({"element_path": path_str})) for path_str in ('*[@id="tableOfContentsContent"]/p/text()', '*[@id="container"]/div[2]/div', "div/div", "//div", "text()")]
+    result: Dict[str, Any] = {}
+    for file, html in fixtures.items():
+        if extract_with_soup(html, element_list) != lxml_extractor.extract(html):
+            raise RuntimeError("parser engine result mismatch, file=%s" % file)
+        for path_element_list, path_extractor in path_extractor_list:
+            if extract_with_soup(html, path_element_list) != path_extractor.extract(html):
+                raise RuntimeError("parser engine result mismatch, file=%s, element_path=%s" % (file, path_element_list["element_path"]))
+        result[file] = {
+            "soup": measure(lambda: extract_with_soup(html, element_list), number),
+            "lxml": measure(lambda: lxml_extractor.extract(html), number),
+        }
+    return result
+
+
+def make_deep_document(depth: int, width: int) -> str:
+    # 각 단계마다 width개의 div와 p를 가지는, depth 깊이의 문서 조각
+    # (get_node_with_path()는 html/body 토큰을 건너뛰므로 html/body 없이 만듦)
+    def make_level(level: int) -> str:
+        if level == depth:
+            return "<p>leaf</p>"
+        children = "".join('<div id="d%d_%d">%s</div><p>text %d</p>' % (level, i, make_level(level + 1) if i == 0 else "<span>s</span>", i) for i in range(width))
+        return children
+    return make_level(0)
+
+
+def legacy_get_node_with_path(soup, path_str: str) -> List[Any]:
+    # 기존 재귀 함수 (노드마다 남기는 추적 로그는 디버그 레벨에서만 출력됨)
+    return HTMLExtractor.get_node_with_path(soup, path_str) or []
+
+
+def bench_path_query(number: int) -> Dict[str, Any]:
+    from bs4 import BeautifulSoup
+
+    depth = 40
+    soup = BeautifulSoup(make_deep_document(depth, 4), "html.parser")
+    path_list = [
+        "/".join(["div[1]"] * depth) + "/p",
+        "/".join(["div"] * 20) + "/p[2]",
+        '*[@id="d20_0"]/div[1]/div/p',
+        "//div/p",
+        "div[1]/div[1]/p[3]/text()",
+    ]
+    result: Dict[str, Any] = {}
+    for path_str in path_list:
+        query = HTMLExtractor.compile_path(path_str)
+        node_list = query.run(soup)
+        if not node_list or legacy_get_node_with_path(soup, path_str) != node_list:
+            raise RuntimeError("path query result mismatch, path=%s" % path_str)
+        name = path_str if len(path_str) <= 20 else path_str[:17] + "..."
+        result[name] = {
+            "legacy": measure(lambda: legacy_get_node_with_path(soup, path_str), number),
+            "compiled": measure(lambda: query.run(soup), number),
+        }
+    return result
+
+
+def print_comparison(title: str, result: Dict[str, Dict[str, float]], baseline: str, candidate: str) -> None:
+    print("# %s" % title)
+    for name, timing in result.items():
+        print("%-20s %s=%9.3fms %s=%9.3fms x%.1f" % (name, baseline, timing[baseline] * 1000, candidate, timing[candidate] * 1000, timing[baseline] / timing[candidate]))
+    print()
+
+
+def print_timings(title: str, result: Dict[str, Dict[str, float]]) -> None:
+    print("# %s" % title)
+    for name, timing in result.items():
+        print("%-20s %s" % (name, " ".join("%s=%9.3fms" % (variant, seconds * 1000) for variant, seconds in timing.items())))
+    print()
+
+
+def save_results(results_file: str, results: Dict[str, Any], number: int) -> None:
+    data = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "number": number,
+        "results": results,
+    }
+    with open(results_file, "w") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+
+def compare_results(baseline_file: str, results: Dict[str, Any], threshold: float) -> int:
+    # 기준 결과보다 threshold배 이상 느려진 항목의 개수를 반환
+    with open(baseline_file, "r") as f:
+        baseline_results = json.load(f)["results"]
+
+    num_regressions = 0
+    print("# compared with %s (threshold x%.2f)" % (baseline_file, threshold))
+    for title, result in results.items():
+        for name, timing in result.items():
+            for variant, seconds in timing.items():
+                baseline_seconds = baseline_results.get(title, {}).get(name, {}).get(variant)
+                if not baseline_seconds:
+                    continue
+                ratio = seconds / baseline_seconds
+                if ratio >= threshold:
+                    num_regressions += 1
+                    print("REGRESSION %s / %s / %s: %.3fms => %.3fms x%.2f" % (title, name, variant, baseline_seconds * 1000, seconds * 1000, ratio))
+    if not num_regressions:
+        print("no regression")
+    print()
+    return num_regressions
+
+
+def print_usage() -> None:
+    print("Usage:\t%s [ -n <number> ] [ -o <results file> ] [ -c <baseline file> ] [ -t <threshold> ] [ -l <latency> ]" % sys.argv[0])
+    print("\t-n: number of calls per measurement (default 20)")
+    print("\t-o: save the results as JSON")
+    print("\t-c: compare with the results saved by -o and exit with 1 on regression")
+    print("\t-t: slowdown ratio reported as regression (default 1.5)")
+    print("\t-l: simulated response latency of the fixture server in milliseconds (default 0)")
+    print()
+
+
+def main() -> int:
+    init_logging()
+
+    number = 20
+    results_file: Optional[str] = None
+    baseline_file: Optional[str] = None
+    threshold = 1.5
+    latency = 0.0
+    excel_file = os.path.abspath("sample.xls")
+
+    optlist, args = getopt.getopt(sys.argv[1:], "hn:o:c:t:l:")
+    for o, a in optlist:
+        if o == "-h":
+            print_usage()
+            return 0
+        elif o == "-n":
+            number = int(a)
+        elif o == "-o":
+            results_file = a
+        elif o == "-c":
+            baseline_file = a
+        elif o == "-t":
+            threshold = float(a)
+        elif o == "-l":
+            latency = float(a) / 1000
+
+    fixtures = load_fixtures()
+    if not fixtures:
+        print("can't find fixture files 'test.*.html'")
+        return -1
+
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as work_dir, FixtureServer(fixtures, get_isbn_list(excel_file), latency) as server:
+        # 모든 측정은 로컬 서버를 가리키는 설정으로 수행함
+        conf_file = make_benchmark_config(Config.get_config_file_path(), work_dir, server.url)
+        os.environ["FEED_MAKER_CONF_FILE"] = conf_file
+
+        results["isbn plan"] = bench_isbn_plan(number)
+        print_comparison("isbn plan", results["isbn plan"], "legacy", "plan")
+        results["search page scan"] = bench_search_scan(fixtures, number)
+        print_comparison("search page scan", results["search page scan"], "legacy", "extractor")
+        print_comparison("search page scan (chunked)", results["search page scan"], "legacy", "stream")
+        results["extract_element"] = bench_extract_element(fixtures, number)
+        print_timings("extract_element", results["extract_element"])
+        results["sanitize"] = bench_sanitize(fixtures, number)
+        print_comparison("sanitize", results["sanitize"], "legacy", "sanitizer")
+        results["parser engine"] = bench_parser_engine(fixtures, number)
+        print_comparison("parser engine", results["parser engine"], "soup", "lxml")
+        results["element path query"] = bench_path_query(number)
+        print_comparison("element path query", results["element path query"], "legacy", "compiled")
+        results["config loading"] = bench_config_loading(conf_file, number)
+        print_timings("config loading", results["config loading"])
+        results["startup"] = bench_startup(5)
+        print_timings("startup", results["startup"])
+        results["end to end"] = bench_end_to_end(excel_file, work_dir, server, 3)
+        print_timings("end to end (%s)" % os.path.basename(excel_file), results["end to end"])
+
+    if results_file:
+        save_results(results_file, results, number)
+    if baseline_file and compare_results(baseline_file, results, threshold) > 0:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+
+
+import os
+import json
+import time
+import datetime
+import sqlite3
+import threading
+import logging
+from typing import Dict, List, Set, Optional, Any
+
+
+logger = logging.getLogger()
+
+# 행 값에 들어 있을 수 있는 날짜/시간 형식 (openpyxl은 날짜 셀을 datetime으로 읽음)
+_DATETIME_TYPES = {
+    "datetime": datetime.datetime,
+    "date": datetime.date,
+    "time": datetime.time,
+}
+
+
+def _encode_value(value: Any) -> Dict[str, str]:
+    # JSON으로 표현할 수 없는 날짜/시간 값은 {"__datetime__": ISO 8601 문자열} 형태로 저장함
+    for type_name, value_type in _DATETIME_TYPES.items():
+        if isinstance(value, value_type):
+            return {"__%s__" % type_name: value.isoformat()}
+    raise TypeError("Object of type %s is not JSON serializable" % type(value).__name__)
+
+
+def _decode_value(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1:
+        for type_name, value_type in _DATETIME_TYPES.items():
+            value = obj.get("__%s__" % type_name)
+            if value is not None:
+                return value_type.fromisoformat(value)
+    return obj
+
+
+class JournalMismatchError(ValueError):
+    pass
+
+
+class Journal:
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+
+    def __init__(self, journal_file: str, source_file: str = "") -> None:
+        self.journal_file = journal_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(journal_file, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS rows (
+                row_num INTEGER PRIMARY KEY,
+                status TEXT NOT NULL,
+                row_values TEXT,
+                error TEXT,
+                updated_at REAL NOT NULL
+            )""")
+
+        if source_file:
+            # 다른 워크북의 저널이면 완료된 행이 엉뚱한 출력에 들어가므로 이어서 처리하지 않음
+            # (예전 저널에는 지정된 경로 그대로 저장되어 있으므로 절대 경로로 바꿔서 비교함)
+            source_file = os.path.abspath(source_file)
+            row = self._conn.execute("SELECT value FROM meta WHERE name = 'source_file'").fetchone()
+            if row and os.path.abspath(row[0]) != source_file:
+                self._conn.close()
+                raise JournalMismatchError("journal '%s' was made for '%s', not '%s', remove it or use another journal file" % (journal_file, row[0], source_file))
+            self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('source_file', ?)", (source_file,))
+
+        # 재시작 시 건너뛸 행 번호만 메모리에 유지하고, 행 내용은 필요할 때 읽음
+        self._done_row_nums: Set[int] = {row_num for (row_num,) in self._conn.execute("SELECT row_num FROM rows WHERE status = ?", (Journal.STATUS_DONE,))}
+        if self._done_row_nums:
+            logger.info("resuming from journal '%s', %d rows already done", journal_file, len(self._done_row_nums))
+
+    def __enter__(self) -> "Journal":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def is_done(self, row_num: int) -> bool:
+        return row_num in self._done_row_nums
+
+    def get_done_row(self, row_num: int) -> Optional[List[Any]]:
+        if row_num not in self._done_row_nums:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT row_values FROM rows WHERE row_num = ?", (row_num,)).fetchone()
+        if not row:
+            return None
+        return json.loads(row[0], object_hook=_decode_value)
+
+    def record_done(self, row_num: int, row_values: List[Any]) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO rows (row_num, status, row_values, error, updated_at) VALUES (?, ?, ?, NULL, ?)",
+                               (row_num, Journal.STATUS_DONE, json.dumps(row_values, ensure_ascii=False, default=_encode_value), time.time()))
+            self._done_row_nums.add(row_num)
+
+    def record_failure(self, row_num: int, error: str) -> None:
+        # 실패한 행은 다음 실행 시 다시 시도함
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO rows (row_num, status, row_values, error, updated_at) VALUES (?, ?, NULL, ?, ?)",
+                               (row_num, Journal.STATUS_FAILED, error, time.time()))
+
+    def get_failures(self) -> Dict[int, str]:
+        with self._lock:
+            return {row_num: error for row_num, error in self._conn.execute("SELECT row_num, error FROM rows WHERE status = ? ORDER BY row_num", (Journal.STATUS_FAILED,))}
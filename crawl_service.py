@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+
+
+import os
+import sys
+import json
+import time
+import socket
+import getopt
+import signal
+import threading
+import logging
+from typing import Dict, List, Optional, Any
+
+from excel_crawling import DESCRIPTION_COL_NUM, CrawlingContext, crawl_description, submit_description, set_description
+from util import Config, ConfigError, get_collection_config, init_logging
+from crawler import CrawlingError
+from isbn_plan import make_isbn_plan
+from job_queue import Job, JobQueue, make_job_queue
+from workbook_io import iter_rows, make_writer
+from metrics import get_metrics
+
+
+logger = logging.getLogger()
+
+
+def get_job_queue_configs() -> Dict[str, Any]:
+    conf = Config().get_job_queue_configs()
+    if not conf:
+        raise ConfigError("no <job_queue> in configuration")
+    return conf
+
+
+def process_job(context: CrawlingContext, queue: JobQueue, worker_id: str, job: Job) -> str:
+    # 작업 하나를 처리하고 결과(done, failed, lost)를 반환하며, 실패한 작업은 남은 시도 횟수가 있으면 다시 큐에 들어감
+    logger.debug("job %d, isbn=%s, attempt %d", job.job_id, job.isbn, job.attempts)
+    if job.fingerprint and job.fingerprint != context.fingerprint:
+        logger.warning("job %d was enqueued with a different configuration than this worker's", job.job_id)
+    # 결과 저장소의 항목은 작업자의 url_prefix로 검색한 결과이므로, 다른 url_prefix의 작업에는 쓰지 않음
+    result_store = context.result_store if job.url_prefix == context.url_prefix else None
+    try:
+        description = result_store.get(job.isbn) if result_store else None
+        if description is None:
+            if context.extraction_pool:
+                description = submit_description(context.crawler, context.search_extractor, job.url_prefix, job.isbn, context.extraction_pool, context.refresher).result()
+            else:
+                description = crawl_description(context.crawler, context.search_extractor, job.url_prefix, job.isbn, refresher=context.refresher)
+            if description is not None and result_store:
+                result_store.put(job.isbn, description)
+    except CrawlingError as e:
+        logger.warning("can't crawl job %d (isbn=%s), %s", job.job_id, job.isbn, e)
+        return "failed" if queue.fail(job.job_id, worker_id, json.dumps(e.to_dict(), ensure_ascii=False)) else "lost"
+    except Exception as e:
+        # 예상하지 못한 오류도 작업만 실패로 기록하고 작업자는 계속 동작함
+        logger.exception("can't process job %d (isbn=%s)", job.job_id, job.isbn)
+        return "failed" if queue.fail(job.job_id, worker_id, json.dumps({"message": str(e)}, ensure_ascii=False)) else "lost"
+    return "done" if queue.complete(job.job_id, worker_id, description, context.fingerprint) else "lost"
+
+
+def run_worker(context: CrawlingContext, queue: JobQueue, worker_id: str, stop_event: threading.Event, poll_interval: float) -> None:
+    # stop_event가 설정될 때까지 큐에서 작업을 받아 처리하며, 큐가 비어 있으면 poll_interval초 기다림
+    metrics = get_metrics()
+    while not stop_event.is_set():
+        job = queue.lease(worker_id)
+        if job is None:
+            stop_event.wait(poll_interval)
+            continue
+        with metrics.timer("stage_seconds", stage="job"):
+            result = process_job(context, queue, worker_id, job)
+        metrics.inc("jobs_total", result=result)
+        if result == "lost":
+            logger.warning("job %d was taken over by another worker after its lease expired", job.job_id)
+
+
+def serve(num_workers: int = 1, num_extract_workers: int = 0, max_extract_queue: Optional[int] = None, worker_id: Optional[str] = None) -> int:
+    # 종료 신호를 받을 때까지 작업을 처리하며, 크롤러와 설정과 컴파일된 셀렉터는 작업 사이에 계속 재사용함
+    try:
+        queue_conf = get_job_queue_configs()
+        context = CrawlingContext(num_workers, num_extract_workers, max_extract_queue)
+    except ConfigError as e:
+        logger.error("can't read configuration, %s", e)
+        return -1
+    if not worker_id:
+        worker_id = "%s:%d" % (socket.gethostname(), os.getpid())
+
+    stop_event = threading.Event()
+
+    def stop(signum, frame) -> None:
+        logger.info("stopping after the current jobs")
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    with context, make_job_queue(queue_conf) as queue:
+        logger.info("worker '%s' started with %d threads, queue backend '%s'", worker_id, num_workers, queue_conf["backend"])
+        thread_list = [threading.Thread(target=run_worker, args=(context, queue, "%s-%d" % (worker_id, i), stop_event, queue_conf["poll_interval"]), daemon=True) for i in range(num_workers)]
+        for thread in thread_list:
+            thread.start()
+        # 주 스레드는 신호를 받을 수 있도록 짧게 나누어 기다림
+        while any(thread.is_alive() for thread in thread_list):
+            for thread in thread_list:
+                thread.join(0.5)
+    return 0
+
+
+def enqueue_workbook(excel_file: str, new_excel_file: Optional[str] = None, timeout: float = 0) -> int:
+    # 워크북의 ISBN을 큐에 넣고, 작업자들이 처리하기를 기다린 뒤 설명을 채운 워크북을 씀
+    if not new_excel_file:
+        new_excel_file = os.path.join(os.path.dirname(excel_file), "new_" + os.path.basename(excel_file))
+    try:
+        queue_conf = get_job_queue_configs()
+        collection_conf = get_collection_config()
+    except ConfigError as e:
+        logger.error("can't read configuration, %s", e)
+        return -1
+
+    plan = make_isbn_plan(iter_rows(excel_file))
+    logger.info("ISBN plan: %s", plan.get_summary())
+    isbn_list = list(plan.get_isbn_index())
+
+    with make_job_queue(queue_conf) as queue:
+        fingerprint = collection_conf.get_fingerprint()
+        job_id_by_isbn = dict(zip(isbn_list, queue.enqueue(collection_conf.url_prefix, isbn_list, fingerprint)))
+        jobs: Dict[int, Job] = {}
+        pending_job_ids = set(job_id_by_isbn.values())
+        started_at = time.monotonic()
+        while pending_job_ids:
+            for job_id, job in queue.get_jobs(list(pending_job_ids)).items():
+                if job.is_finished:
+                    jobs[job_id] = job
+                    pending_job_ids.discard(job_id)
+            if not pending_job_ids:
+                break
+            if timeout and time.monotonic() - started_at >= timeout:
+                logger.error("%d of %d jobs are not finished in %g seconds", len(pending_job_ids), len(job_id_by_isbn), timeout)
+                return -1
+            logger.info("waiting for %d of %d jobs", len(pending_job_ids), len(job_id_by_isbn))
+            time.sleep(queue_conf["poll_interval"])
+
+    # 작업자의 설정이 이 설정과 다르면, 다음에 큐에 넣을 때 다시 처리됨
+    num_other_config_jobs = sum(1 for job in jobs.values() if job.status == Job.STATUS_DONE and job.fingerprint != fingerprint)
+    if num_other_config_jobs:
+        logger.warning("%d jobs were done by workers with a different configuration", num_other_config_jobs)
+
+    failed_isbn_list: List[str] = []
+    with make_writer(new_excel_file) as writer:
+        for row_num, row in iter_rows(excel_file):
+            isbn = plan.get_isbn(row_num)
+            if isbn is not None:
+                job = jobs[job_id_by_isbn[isbn]]
+                if job.status == Job.STATUS_DONE:
+                    row = set_description(list(row), row_num, DESCRIPTION_COL_NUM, job.description)
+                else:
+                    failed_isbn_list.append(isbn)
+            writer.write_row(row_num, row)
+    if failed_isbn_list:
+        logger.warning("%d rows failed (%s), enqueue again to retry them", len(failed_isbn_list), ", ".join(sorted(set(failed_isbn_list))))
+    return 0
+
+
+def print_usage() -> None:
+    print("Usage:\t%s [ -w <num workers> ] [ -e <num extract workers> ] [ -i <worker id> ] [ -m ] [ -d ]" % sys.argv[0])
+    print("\t%s -q [ -o <output file> ] [ -t <timeout> ] <excel file>" % sys.argv[0])
+    print("\tRuns a crawling worker taking ISBN lookup jobs from <job_queue> until SIGINT/SIGTERM.")
+    print("\t-w, --workers: number of jobs processed concurrently (default 1)")
+    print("\t-e, --extract-workers: number of processes extracting descriptions from HTML (default 0, in the worker threads)")
+    print("\t--extract-queue: max number of fetched pages waiting for extraction (default 2 x extract workers)")
+    print("\t-i, --worker-id: name recorded with leased jobs (default <hostname>:<pid>)")
+    print("\t-m, --metrics: print per-stage timings and job counts when stopped")
+    print("\t-d, --debug: write debug logs to run.log")
+    print("\t-q, --enqueue: put the ISBNs of the workbook on the queue, wait for the workers and write new_<excel file>")
+    print("\t-o, --output: output file, .xls/.xlsx/.csv (default new_<excel file>)")
+    print("\t-t, --timeout: seconds to wait for the jobs (default 0, no limit)")
+    print()
+
+
+def main() -> int:
+    init_logging()
+
+    num_workers = 1
+    num_extract_workers = 0
+    max_extract_queue: Optional[int] = None
+    worker_id: Optional[str] = None
+    print_metrics = False
+    enqueue_mode = False
+    new_excel_file: Optional[str] = None
+    timeout = 0.0
+
+    optlist, args = getopt.getopt(sys.argv[1:], "hw:e:i:mdqo:t:", ["help", "workers=", "extract-workers=", "extract-queue=", "worker-id=", "metrics", "debug", "enqueue", "output=", "timeout="])
+    for o, a in optlist:
+        if o in ("-h", "--help"):
+            print_usage()
+            return 0
+        elif o in ("-w", "--workers"):
+            num_workers = int(a)
+        elif o in ("-e", "--extract-workers"):
+            num_extract_workers = int(a)
+        elif o == "--extract-queue":
+            max_extract_queue = int(a)
+        elif o in ("-i", "--worker-id"):
+            worker_id = a
+        elif o in ("-m", "--metrics"):
+            print_metrics = True
+        elif o in ("-d", "--debug"):
+            logger.setLevel(logging.DEBUG)
+        elif o in ("-q", "--enqueue"):
+            enqueue_mode = True
+        elif o in ("-o", "--output"):
+            new_excel_file = a
+        elif o in ("-t", "--timeout"):
+            timeout = float(a)
+
+    if enqueue_mode:
+        if len(args) < 1:
+            print_usage()
+            return -1
+        return enqueue_workbook(args[0], new_excel_file, timeout)
+
+    metrics = get_metrics()
+    if print_metrics:
+        metrics.enable()
+    result = serve(num_workers, num_extract_workers, max_extract_queue, worker_id)
+    if print_metrics:
+        logger.info("run metrics:\n%s", metrics.get_summary())
+    return result
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,13 +7,17 @@ import re
 from enum import Enum
 import time
 import getopt
-import requests
+import threading
+from urllib.parse import urlsplit
 import logging
-import logging.config
-from typing import Dict, Optional, Union, Any
+from typing import Dict, Tuple, Iterator, Callable, Optional, Union, Any, TYPE_CHECKING
+
+from metrics import get_metrics
+
+if TYPE_CHECKING:
+    import requests
 
 
-logging.config.fileConfig("logging.conf")
 logger = logging.getLogger()
 
 
@@ -23,38 +27,291 @@ class Method(Enum):
     POST = 3
 
 
+class CrawlingError(Exception):
+    def __init__(self, message: str, url: str = "", status_code: Optional[int] = None, reason: str = "", attempts: int = 0) -> None:
+        super().__init__(message)
+        self.url = url
+        self.status_code = status_code
+        self.reason = reason
+        self.attempts = attempts
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"message": str(self), "url": self.url, "status_code": self.status_code, "reason": self.reason, "attempts": self.attempts}
+
+
+class CircuitOpenError(CrawlingError):
+    pass
+
+
+class ConditionalResponse:
+    # 조건부 요청의 결과로, 304이면 not_modified가 True이고 본문이 없음
+    def __init__(self, status_code: int, text: Optional[str], etag: Optional[str], last_modified: Optional[str], content_length: Optional[int]) -> None:
+        self.status_code = status_code
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_length = content_length
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status_code == 304
+
+
 class Crawler():
-    def __init__(self, method, headers, timeout, encoding=None) -> None:
+    def __init__(self, method, headers, timeout, encoding=None, pool_connections: int = 10, pool_maxsize: int = 10, max_retries: int = 0, cache=None, rate_limiter=None, retry_policy=None, circuit_breaker=None) -> None:
         self.method = method
         self.timeout = timeout
         self.headers = headers
         self.encoding = encoding
+        # host별 커넥션 풀 크기(pool_maxsize)와 host 수(pool_connections)
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        # GET 응답을 저장하는 디스크 캐시 (http_cache.HTTPCache)
+        self.cache = cache
+        # host별 요청 속도 제한 (rate_limiter.HostRateLimiter)
+        self.rate_limiter = rate_limiter
+        # 실패한 요청의 재시도(retry_policy.RetryPolicy)와 host별 차단기(retry_policy.CircuitBreaker)
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self._session: Optional["requests.Session"] = None
+        self._session_lock = threading.Lock()
+
+    def __enter__(self) -> "Crawler":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def get_session(self) -> "requests.Session":
+        # 여러 스레드가 하나의 세션(커넥션 풀)을 공유하므로 최초 생성만 잠금으로 보호
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    # requests는 처음 요청을 보낼 때 읽어들임
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    from urllib3.util.retry import Retry
+
+                    retry = Retry(total=self.max_retries, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504), raise_on_status=False)
+                    adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize, max_retries=retry)
+                    session = requests.Session()
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._session = session
+        return self._session
+
+    def close(self) -> None:
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def send_request(self, method: Method, url, headers: Dict[str, str], stream: bool = False) -> "requests.Response":
+        # 실제로 네트워크 요청을 보내는 부분으로, 캐시에서 응답한 경우에는 호출되지 않음
+        # (stream이면 헤더까지만 받고 반환하므로, 본문은 호출한 쪽에서 읽고 닫아야 함)
+        metrics = get_metrics()
+        waited = 0.0
+        if self.rate_limiter:
+            waited = self.rate_limiter.acquire(url)
+        started_at = time.perf_counter() if metrics.enabled else 0.0
+        response = self.get_session().request(method.name, url, headers=headers, timeout=self.timeout, stream=stream)
+        if metrics.enabled:
+            host = urlsplit(url).netloc
+            metrics.observe("fetch_seconds", time.perf_counter() - started_at, host=host)
+            if not stream:
+                # 스트리밍 요청과 같은 단위로, 압축을 풀기 전에 받은 바이트 수를 셈
+                metrics.inc("downloaded_bytes_total", response.raw.tell(), host=host)
+            metrics.inc("responses_total", host=host, status=response.status_code)
+            if waited > 0:
+                metrics.inc("rate_limit_wait_seconds_total", waited, host=host)
+        if self.rate_limiter:
+            self.rate_limiter.update(url, response.status_code, response.headers.get("Retry-After"))
+        return response
 
     def make_request(self, url) -> Any:
         #print(url, self.method, self.headers)
-        if self.method == Method.GET:
-            response = requests.get(url, headers=self.headers, timeout=self.timeout)
-        elif self.method == Method.HEAD:
-            response = requests.head(url, headers=self.headers, timeout=self.timeout)
-        elif self.method == Method.POST:
-            response = requests.post(url, headers=self.headers, timeout=self.timeout)
-        if response.status_code == 200:
-            if self.encoding:
-                response.encoding = self.encoding
-            else:
-                response.encoding = 'utf-8'
-            return response.text
-        #print(response.status_code)
+        status_code, text = self.fetch(url)
+        if status_code == 200:
+            return text
+        #print(status_code)
         return None
+
+    def fetch(self, url) -> Tuple[int, Optional[str]]:
+        # (상태 코드, 응답 본문)을 반환하며, 본문은 200일 때만 채워짐
+        if self.method == Method.GET and self.cache:
+            return self.fetch_with_cache(url)
+        response = self.send_request(self.method, url, self.headers)
+        if response.status_code == 200:
+            return response.status_code, self.decode_response(response)
+        return response.status_code, None
+
+    def fetch_with_cache(self, url) -> Tuple[int, Optional[str]]:
+        key = self.cache.make_key("GET", url, self.headers)
+        entry = self.cache.get(key)
+        if entry and entry.is_fresh(self.cache.ttl):
+            logger.debug("cache hit, url=%s", url)
+            get_metrics().inc("cache_requests_total", result="hit")
+            return 200, entry.text
+
+        headers = dict(self.headers)
+        if entry:
+            # 만료된 항목은 ETag/Last-Modified로 재검증
+            headers.update(entry.get_validator_headers())
+        response = self.send_request(Method.GET, url, headers)
+        if response.status_code == 304 and entry:
+            logger.debug("cache revalidated, url=%s", url)
+            get_metrics().inc("cache_requests_total", result="revalidated")
+            self.cache.refresh(key)
+            return 200, entry.text
+        get_metrics().inc("cache_requests_total", result="miss")
+        if response.status_code == 200:
+            text = self.decode_response(response)
+            self.cache.put(key, url, text, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+            return 200, text
+        return response.status_code, None
+
+    def fetch_conditional(self, url, etag: Optional[str] = None, last_modified: Optional[str] = None, method: Method = Method.GET) -> Tuple[int, Optional[ConditionalResponse]]:
+        # 캐시를 거치지 않고 ETag/Last-Modified로 조건부 요청을 보내며, 200과 304일 때만 결과를 반환함
+        headers = dict(self.headers)
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        response = self.send_request(method, url, headers)
+        if response.status_code not in (200, 304):
+            return response.status_code, None
+        text = self.decode_response(response) if method == Method.GET and response.status_code == 200 else None
+        content_length = response.headers.get("Content-Length")
+        return response.status_code, ConditionalResponse(response.status_code, text, response.headers.get("ETag"), response.headers.get("Last-Modified"), int(content_length) if content_length and content_length.isdigit() else None)
+
+    def iter_text(self, response, chunk_size: int = 8192) -> Iterator[str]:
+        # 응답 본문을 받는 대로 디코딩해서 조각 단위로 반환함
+        response.encoding = self.encoding if self.encoding else "utf-8"
+        for chunk in response.iter_content(chunk_size, decode_unicode=True):
+            if chunk:
+                yield chunk
+
+    def fetch_stream(self, url, consume: Callable[[Iterator[str]], Any]) -> Tuple[int, Optional[Tuple[Any]]]:
+        # 본문 조각들을 consume()에 넘기고, consume()이 반환하면 나머지 본문은 받지 않고 연결을 닫음
+        # 캐시를 쓰면 나머지 본문도 끝까지 받아서 저장하며, 이때는 연결도 커넥션 풀로 돌아감
+        # (끝까지 읽지 않은 연결은 재사용할 수 없으므로, 캐시가 없을 때는 요청마다 새 연결을 맺는 대신 본문을 덜 받음)
+        # (consume()의 결과가 None이어도 성공으로 처리되도록 튜플로 감싸서 반환함)
+        key: Optional[str] = None
+        entry = None
+        headers = self.headers
+        if self.method == Method.GET and self.cache:
+            key = self.cache.make_key("GET", url, self.headers)
+            entry = self.cache.get(key)
+            if entry and entry.is_fresh(self.cache.ttl):
+                logger.debug("cache hit, url=%s", url)
+                get_metrics().inc("cache_requests_total", result="hit")
+                return 200, (consume(iter([entry.text])),)
+            if entry:
+                # fetch_with_cache()와 마찬가지로 만료된 항목은 ETag/Last-Modified로 재검증
+                headers = dict(self.headers)
+                headers.update(entry.get_validator_headers())
+
+        response = self.send_request(Method.GET, url, headers, stream=True)
+        try:
+            if key:
+                if response.status_code == 304 and entry:
+                    logger.debug("cache revalidated, url=%s", url)
+                    get_metrics().inc("cache_requests_total", result="revalidated")
+                    self.cache.refresh(key)
+                    return 200, (consume(iter([entry.text])),)
+                get_metrics().inc("cache_requests_total", result="miss")
+            if response.status_code != 200:
+                return response.status_code, None
+            chunk_list = []
+
+            def iter_chunks() -> Iterator[str]:
+                for chunk in self.iter_text(response):
+                    if key:
+                        chunk_list.append(chunk)
+                    yield chunk
+
+            chunks = iter_chunks()
+            result = consume(chunks)
+            if key:
+                # consume()이 읽지 않은 나머지 본문까지 받아서 전체 페이지를 캐시에 저장함
+                for _ in chunks:
+                    pass
+                self.cache.put(key, url, "".join(chunk_list), response.headers.get("ETag"), response.headers.get("Last-Modified"))
+            return 200, (result,)
+        finally:
+            metrics = get_metrics()
+            if metrics.enabled:
+                metrics.inc("downloaded_bytes_total", response.raw.tell(), host=urlsplit(url).netloc)
+            response.close()
+
+    def decode_response(self, response) -> str:
+        if self.encoding:
+            response.encoding = self.encoding
+        else:
+            response.encoding = 'utf-8'
+        return response.text
             
     def run(self, url) -> str:
-        response = None
-        response = self.make_request(url)
-        if not response:
-            logger.warning("can't get response from '%s'" % url)
-            sys.exit(-1)
+        return self.run_with_retry(url, self.fetch)
 
+    def run_stream(self, url, consume: Callable[[Iterator[str]], Any]) -> Any:
+        return self.run_with_retry(url, lambda u: self.fetch_stream(u, consume))[0]
 
-        return response
+    def run_conditional(self, url, etag: Optional[str] = None, last_modified: Optional[str] = None, method: Method = Method.GET) -> ConditionalResponse:
+        return self.run_with_retry(url, lambda u: self.fetch_conditional(u, etag, last_modified, method))
+
+    def run_with_retry(self, url, fetch: Callable[[str], Tuple[int, Any]]) -> Any:
+        # 재시도 정책에 따라 재시도하고, 최종적으로 실패하면 CrawlingError를 발생시킴
+        # (fetch는 (상태 코드, 결과)를 반환하며, 결과가 비어 있으면 실패로 간주함)
+        import requests
 
+        max_attempts = self.retry_policy.max_attempts if self.retry_policy else 1
+        attempt = 0
+        while True:
+            attempt += 1
+            if self.circuit_breaker and not self.circuit_breaker.allow_request(url):
+                get_metrics().inc("circuit_rejections_total", host=urlsplit(url).netloc)
+                raise CircuitOpenError("circuit open for '%s'" % url, url, None, "circuit open", attempt - 1)
+
+            status_code: Optional[int] = None
+            response: Optional[str] = None
+            try:
+                status_code, response = fetch(url)
+            except requests.RequestException as e:
+                is_retryable = self.retry_policy.is_retryable_exception(e) if self.retry_policy else False
+                reason = "%s: %s" % (type(e).__name__, e)
+                # 상태 코드와 마찬가지로 재시도할 연결 문제만 host의 장애로 간주함 (InvalidURL, TooManyRedirects 등은 제외)
+                if self.circuit_breaker:
+                    if is_retryable:
+                        self.circuit_breaker.record_failure(url)
+                    else:
+                        self.circuit_breaker.record_success(url)
+                if not is_retryable or attempt >= max_attempts:
+                    raise CrawlingError("can't get response from '%s', %r" % (url, e), url, None, reason, attempt) from e
+            except BaseException:
+                # consume() 등에서 발생한 다른 예외로 half-open 상태의 시험 요청이 끝나지 않은 채로 남지 않게 함
+                if self.circuit_breaker:
+                    self.circuit_breaker.release_trial(url)
+                raise
+            else:
+                if response:
+                    if self.circuit_breaker:
+                        self.circuit_breaker.record_success(url)
+                    return response
+                is_retryable = self.retry_policy.is_retryable_status(status_code) if self.retry_policy else False
+                reason = "empty response" if status_code == 200 else "status %d" % status_code
+                if self.circuit_breaker:
+                    # 서버 오류만 host의 장애로 간주함
+                    if is_retryable:
+                        self.circuit_breaker.record_failure(url)
+                    else:
+                        self.circuit_breaker.record_success(url)
+                if not is_retryable or attempt >= max_attempts:
+                    logger.warning("can't get response from '%s'", url)
+                    raise CrawlingError("can't get response from '%s', %s" % (url, reason), url, status_code, reason, attempt)
 
+            delay = self.retry_policy.get_delay(attempt)
+            get_metrics().inc("retries_total", host=urlsplit(url).netloc)
+            logger.info("retrying '%s' in %.2fs (attempt %d/%d, %s)", url, delay, attempt, max_attempts, reason)
+            time.sleep(delay)
@@ -1,131 +1,625 @@
 #!/usr/bin/env python
 
+import os
 import sys
-import re
+import glob
+import json
+import getopt
 import signal
+import threading
 import logging
-from typing import Dict, Optional, Union, Any
-
-import xlrd
-import xlwt
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, List, Tuple, Deque, Iterable, Iterator, Callable, Optional, Union, Any
 
 from extract_element import extract_element
-from util import Config, IO, HTMLExtractor
-from crawler import Crawler, Method
+from extraction_pool import ExtractionPool, ExtractionError, chain_future
+from util import Config, ConfigError, IO, HTMLExtractor, get_collection_config, init_logging
+from crawler import Crawler, Method, CrawlingError
+from http_cache import HTTPCache
+from rate_limiter import HostRateLimiter
+from retry_policy import RetryPolicy, CircuitBreaker
+from checkpoint import Journal
+from incremental_refresh import IncrementalRefresher, RefreshStore
+from isbn_plan import make_isbn_plan
+from result_store import ResultStore
+from workbook_io import RowWriter, check_row_limit, get_sheet_names, iter_rows, make_writer
+from search_extractor import SearchResultExtractor
+from metrics import get_metrics
 
 
-logging.config.fileConfig("logging.conf")
 logger = logging.getLogger()
-signal.signal(signal.SIGPIPE, signal.SIG_DFL)
-
-
-def convert_isbn(isbn: str) -> str:
-    isbn = isbn.strip()
-
-    # 숫자로 저장된 셀의 값을 정수값 문자열로 변환
-    isbn = re.sub(r'\.0$', '', isbn)
-    # -제거
-    isbn = re.sub(r'-', '', isbn)
-
-    # 13자리 이상의 숫자로 구성된 문자열인지 검사
-    m = re.search(r'(?P<isbn>[0-9]{13,})', isbn)
-    if not m:
-        raise ValueError
-    isbn = m.group("isbn")
-    return isbn
-
-
-def read_excel_file(excel_file: str) -> int:
-    new_excel_file = "new_" + excel_file
-    isbn: str = ""
-    isbn_code: str = ""
-    description: str = ""
-    method = Method.GET
-    headers = {"Accept-Encoding": "gzip, deflate", "User-Agent": "Mozillla/5.0 (Macintosh; Intel Mac OS X 10_13_6) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/67.0.3396.99 Safari/537.36", "Accept": "*/*", "Connection": "Keep-Alive"}
-    timeout = 10
-    encoding: Optional[str] = None
-    description_col_num = 28
-
-    config = Config()
-    if not config:
-        logger.error("can't read configuration")
-        sys.exit(-1)
-    collection_conf = config.get_collection_configs()
-    url_prefix = collection_conf["url_prefix"]
-    encoding = collection_conf["encoding"]
-    logger.debug("url_prefix=%s" % url_prefix)
 
-    workbook = xlrd.open_workbook(excel_file)
-    worksheet1 = workbook.sheet_by_index(0)
-    num_rows = worksheet1.nrows
+# 배치 모드에서 디렉토리를 지정했을 때 처리하는 워크북 파일의 확장자
+INPUT_FILE_EXTENSIONS = (".xls", ".xlsx", ".csv")
+# 추출된 설명을 쓰는 열
+DESCRIPTION_COL_NUM = 28
+
+
+def search_detail_url(crawler: Crawler, search_extractor: SearchResultExtractor, url_prefix: str, isbn_code: str) -> Optional[str]:
+    # ISBN으로 검색하고 첫번째 검색 결과의 상세 페이지 URL을 반환하며, 검색 결과가 없으면 None을 반환
+    url = url_prefix + isbn_code
+    logger.debug("url=%s", url)
+
+    # ISBN -> bid
+    # 검색 결과 페이지는 받는 대로 훑어보고, 첫번째 결과의 링크를 찾으면 나머지는 받지 않음
+    # (stage_seconds의 search는 본문을 받는 시간을 포함함)
+    with get_metrics().timer("stage_seconds", stage="search"):
+        detail_url = crawler.run_stream(url, search_extractor.extract_first_link_from_chunks)
+    if detail_url:
+        logger.debug("detail_url=%s", detail_url)
+    return detail_url
+
 
-    new_workbook = xlwt.Workbook()
-    new_worksheet = new_workbook.add_sheet("Sheet1", cell_overwrite_ok=True)
+def crawl_description(crawler: Crawler, search_extractor: SearchResultExtractor, url_prefix: str, isbn_code: str, extract: Callable[[str], str] = extract_element, refresher: Optional[IncrementalRefresher] = None) -> Optional[str]:
+    # 상세 페이지에서 설명을 추출하며, 검색 결과가 없으면 None을 반환
+    detail_url = search_detail_url(crawler, search_extractor, url_prefix, isbn_code)
+    if not detail_url:
+        return None
+    if refresher:
+        # 지난 실행 이후 바뀌지 않은 페이지는 저장된 설명을 그대로 씀
+        result = refresher.fetch(detail_url)
+        if not result.is_changed:
+            return result.state.description
+        with get_metrics().timer("stage_seconds", stage="extract"):
+            description = extract(result.html)
+        refresher.save(result, description)
+        return description
+    html = crawler.run(detail_url)
+    with get_metrics().timer("stage_seconds", stage="extract"):
+        return extract(html)
 
-    crawler = Crawler(method, headers, timeout, encoding)
 
-    for row_num in range(num_rows):
-        do_crawl = True
-        do_extract = False
+def submit_description(crawler: Crawler, search_extractor: SearchResultExtractor, url_prefix: str, isbn_code: str, extraction_pool: ExtractionPool, refresher: Optional[IncrementalRefresher] = None) -> Future:
+    # 상세 페이지를 가져온 뒤 추출 단계로 넘기고, 추출된 설명을 가질 Future를 바로 반환
+    future: Future = Future()
+    detail_url = search_detail_url(crawler, search_extractor, url_prefix, isbn_code)
+    if not detail_url:
+        future.set_result(None)
+        return future
+    if refresher:
+        result = refresher.fetch(detail_url)
+        if not result.is_changed:
+            future.set_result(result.state.description)
+            return future
 
-        row = worksheet1.row_values(row_num)
-        isbn = str(row[0])
+        def save(done_future: Future) -> Optional[str]:
+            description = done_future.result()
+            refresher.save(result, description)
+            return description
 
+        return chain_future(extraction_pool.submit(result.html), save)
+    return extraction_pool.submit(crawler.run(detail_url))
+
+
+class DescriptionMemo:
+    # 같은 ISBN은 한 번만 크롤링하고, 그 결과를 같은 ISBN을 가진 모든 행에서 공유함
+    def __init__(self, isbn_row_counts: Dict[str, int]) -> None:
+        self._lock = threading.Lock()
+        self._futures: Dict[str, Future] = {}
+        # 남은 행이 없는 ISBN의 결과는 메모리에서 제거함
+        self._remaining_counts = dict(isbn_row_counts)
+
+    def get(self, isbn_code: str, func: Callable[[], Optional[str]]) -> Optional[str]:
+        def submit() -> Future:
+            future: Future = Future()
+            try:
+                future.set_result(func())
+            except BaseException as e:
+                future.set_exception(e)
+            return future
+
+        return self.get_future(isbn_code, submit).result()
+
+    def get_future(self, isbn_code: str, submit: Callable[[], Future]) -> Future:
+        # 처음 요청한 행만 submit()을 호출하고, 나머지 행은 같은 Future를 받음
+        with self._lock:
+            future = self._futures.get(isbn_code)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._futures[isbn_code] = future
         try:
-            isbn_code = convert_isbn(isbn)
+            if is_owner:
+                try:
+                    submit().add_done_callback(lambda done_future: DescriptionMemo._copy_result(done_future, future))
+                except BaseException as e:
+                    future.set_exception(e)
+            return future
+        finally:
+            with self._lock:
+                remaining_count = self._remaining_counts.get(isbn_code, 0) - 1
+                self._remaining_counts[isbn_code] = remaining_count
+                if remaining_count <= 0:
+                    self._futures.pop(isbn_code, None)
+                    self._remaining_counts.pop(isbn_code, None)
+
+    @staticmethod
+    def _copy_result(source: Future, target: Future) -> None:
+        e = source.exception()
+        if e is not None:
+            target.set_exception(e)
+        else:
+            target.set_result(source.result())
+
+
+def set_description(row: List[Any], row_num: int, description_col_num: int, description: Optional[str], dump_file: Optional[str] = None) -> List[Any]:
+    if description is not None:
+        # .csv/.xlsx의 행은 마지막 값이 있는 열까지만 읽히므로 설명 열까지 빈 값으로 채움
+        if len(row) <= description_col_num:
+            row.extend([""] * (description_col_num + 1 - len(row)))
+        row[description_col_num] = description
+        logger.debug("row %d, len=%d", row_num, len(row[description_col_num]))
+        #logger.debug("row[description_col_num]=%s", row[description_col_num])
+        if dump_file:
+            # 진단 모드에서만 추출된 내용을 파일로 남김
+            with open(dump_file, "w") as outfile:
+                outfile.write(row[description_col_num])
+                outfile.write("\n")
+    return row
+
+
+def crawl_row(crawler: Crawler, search_extractor: SearchResultExtractor, url_prefix: str, row_num: int, row: List[Any], isbn_code: str, description_col_num: int, memo: Optional[DescriptionMemo] = None, extraction_pool: Optional[ExtractionPool] = None, dump_file: Optional[str] = None, refresher: Optional[IncrementalRefresher] = None, result_store: Optional[ResultStore] = None) -> Union[List[Any], Future]:
+    # isbn_code는 ISBN 계획에서 정규화하고 검증한 ISBN-13이며, 추출 단계를 쓰면 추출이 끝났을 때 행을 반환하는 Future를 반환
+    logger.debug("isbn=%s", isbn_code)
+
+    if result_store:
+        # 다른 프로세스나 이전 실행에서 추출한 결과가 있으면 네트워크 요청 없이 바로 씀
+        description = result_store.get(isbn_code)
+        get_metrics().inc("result_store_total", result="hit" if description is not None else "miss")
+        if description is not None:
+            return set_description(row, row_num, description_col_num, description, dump_file)
+
+    def store(description: Optional[str]) -> Optional[str]:
+        if result_store and description is not None:
+            result_store.put(isbn_code, description)
+        return description
+
+    if extraction_pool:
+        def submit() -> Future:
+            return chain_future(submit_description(crawler, search_extractor, url_prefix, isbn_code, extraction_pool, refresher), lambda done_future: store(done_future.result()))
+
+        future = memo.get_future(isbn_code, submit) if memo else submit()
+        return chain_future(future, lambda done_future: set_description(row, row_num, description_col_num, done_future.result(), dump_file))
+
+    def crawl() -> Optional[str]:
+        return store(crawl_description(crawler, search_extractor, url_prefix, isbn_code, refresher=refresher))
+
+    description = memo.get(isbn_code, crawl) if memo else crawl()
+    return set_description(row, row_num, description_col_num, description, dump_file)
+
+
+def get_row_result(result: Union[List[Any], Future]) -> List[Any]:
+    # 작업 스레드의 Future와 추출 단계의 Future가 겹쳐 있을 수 있음
+    while isinstance(result, Future):
+        result = result.result()
+    return result
+
+
+def process_rows(rows: Iterable[Tuple[int, List[Any]]], func: Callable[[int, List[Any]], Union[List[Any], Future]], num_workers: int = 1, executor: Optional[ThreadPoolExecutor] = None, num_extra_pending: int = 0) -> Iterator[Tuple[int, List[Any]]]:
+    # func는 처리된 행이나, 처리가 끝나면 행을 반환하는 Future를 반환함
+    if num_workers > 1 and executor is None:
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            yield from process_rows(rows, func, num_workers, executor, num_extra_pending)
+        return
+
+    # 동시에 진행 중인 행의 개수를 제한하면서 원래의 행 순서대로 결과를 반환
+    max_pending = (num_workers * 2 if executor else 1) + num_extra_pending
+    pending: Deque[Tuple[int, Union[List[Any], Future]]] = deque()
+    for row_num, row in rows:
+        if executor:
+            pending.append((row_num, executor.submit(func, row_num, row)))
+        else:
+            pending.append((row_num, func(row_num, row)))
+        if len(pending) >= max_pending:
+            done_row_num, result = pending.popleft()
+            yield done_row_num, get_row_result(result)
+    while pending:
+        done_row_num, result = pending.popleft()
+        yield done_row_num, get_row_result(result)
+
+
+class CrawlingContext:
+    # 여러 워크북과 시트를 처리하는 동안 크롤러, 캐시, 작업 스레드 풀, 추출 단계를 공유함
+    def __init__(self, num_workers: int = 1, num_extract_workers: int = 0, max_extract_queue: Optional[int] = None, dump_dir: Optional[str] = None) -> None:
+        method = Method.GET
+        headers = {"Accept-Encoding": "gzip, deflate", "User-Agent": "Mozillla/5.0 (Macintosh; Intel Mac OS X 10_13_6) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/67.0.3396.99 Safari/537.36", "Accept": "*/*", "Connection": "Keep-Alive"}
+        timeout = 10
+
+        # 잘못된 설정은 크롤링을 시작하기 전에 ConfigError로 실패함
+        collection_conf = get_collection_config()
+        config = Config()
+        self.url_prefix = collection_conf.url_prefix
+        logger.debug("url_prefix=%s", self.url_prefix)
+        # 추출 결과에 영향을 주는 설정의 해시
+        self.fingerprint = collection_conf.get_fingerprint()
+        self.search_extractor = SearchResultExtractor(collection_conf.search_list_pattern, collection_conf.search_link_pattern)
+        self.num_workers = num_workers
+        # 진단 모드에서 추출된 내용을 행마다 저장하는 디렉토리
+        self.dump_dir = dump_dir
+        if dump_dir:
+            os.makedirs(dump_dir, exist_ok=True)
+
+        self.cache: Optional[HTTPCache] = None
+        cache_conf = config.get_cache_configs()
+        if cache_conf and cache_conf["enable"]:
+            self.cache = HTTPCache(cache_conf["cache_dir"], cache_conf["ttl"], cache_conf["max_size"])
+
+        rate_limiter: Optional[HostRateLimiter] = None
+        rate_limit_conf = config.get_rate_limit_configs()
+        if rate_limit_conf and rate_limit_conf["enable"]:
+            rate_limiter = HostRateLimiter(rate_limit_conf["requests_per_second"], rate_limit_conf["burst"], rate_limit_conf["min_requests_per_second"], rate_limit_conf["max_requests_per_second"])
+
+        retry_policy = RetryPolicy()
+        circuit_breaker = CircuitBreaker()
+        retry_conf = config.get_retry_configs()
+        if retry_conf:
+            retry_policy = RetryPolicy(retry_conf["max_attempts"], retry_conf["backoff_base"], retry_conf["backoff_max"], retry_conf["retryable_status_codes"], RetryPolicy.get_exception_classes(retry_conf["retryable_exceptions"]))
+            circuit_breaker = CircuitBreaker(retry_conf["failure_threshold"], retry_conf["reset_timeout"])
+
+        # 작업 스레드 수만큼 book.naver.com에 대한 연결을 유지하고 재사용함
+        self.crawler = Crawler(method, headers, timeout, collection_conf.encoding, pool_maxsize=max(num_workers, 1), cache=self.cache, rate_limiter=rate_limiter, retry_policy=retry_policy, circuit_breaker=circuit_breaker)
+
+        # 여러 프로세스가 공유하는 ISBN별 추출 결과
+        self.result_store: Optional[ResultStore] = None
+        result_store_conf = config.get_result_store_configs()
+        if result_store_conf and result_store_conf["enable"]:
+            self.result_store = ResultStore(result_store_conf["store_file"], self.fingerprint, result_store_conf["ttl"])
+
+        # 주기적인 갱신에서 바뀐 상세 페이지만 다시 추출함
+        self.refresher: Optional[IncrementalRefresher] = None
+        refresh_conf = config.get_refresh_configs()
+        if refresh_conf and refresh_conf["enable"]:
+            self.refresher = IncrementalRefresher(self.crawler, RefreshStore(refresh_conf["store_file"]), refresh_conf["use_head"], self.fingerprint)
+
+        self.executor: Optional[ThreadPoolExecutor] = None
+        if num_workers > 1:
+            self.executor = ThreadPoolExecutor(max_workers=num_workers)
+        # 파싱과 추출은 CPU를 쓰는 작업이므로 GIL에 묶이지 않도록 별도의 프로세스에서 수행함
+        self.extraction_pool: Optional[ExtractionPool] = None
+        if num_extract_workers > 0:
+            self.extraction_pool = ExtractionPool(num_extract_workers, max_extract_queue)
+
+    def __enter__(self) -> "CrawlingContext":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self.executor:
+            self.executor.shutdown()
+        if self.extraction_pool:
+            self.extraction_pool.close()
+        self.crawler.close()
+        if self.cache:
+            self.cache.close()
+        if self.refresher:
+            logger.info("incremental refresh: %s", self.refresher.get_summary())
+            self.refresher.store.close()
+        if self.result_store:
+            self.result_store.close()
+
+
+def process_sheet(context: CrawlingContext, excel_file: str, sheet_index: int, writer: RowWriter, journal: Optional[Journal] = None) -> int:
+    # 시트 하나를 처리하고 실패한 행의 개수를 반환
+    description_col_num = DESCRIPTION_COL_NUM
+
+    failed_row_nums: List[int] = []
+    metrics = get_metrics()
+
+    # 사전 처리: ISBN 열을 한 번에 정규화하고 검증해서, 잘못된 행은 네트워크 요청 없이 건너뛰고
+    # 같은 ISBN이 여러 행에 있으면 한 번만 크롤링함
+    with metrics.timer("stage_seconds", stage="plan"):
+        plan = make_isbn_plan((row_num, row) for row_num, row in iter_rows(excel_file, sheet_index) if not (journal and journal.is_done(row_num)))
+        isbn_index = plan.get_isbn_index()
+    logger.info("ISBN plan: %s", plan.get_summary())
+    num_isbn_rows = len(plan.isbn_by_row)
+    if num_isbn_rows > 0:
+        logger.info("dedup ratio %.1f%%", (1 - len(isbn_index) / num_isbn_rows) * 100)
+    memo = DescriptionMemo({isbn_code: len(row_num_list) for isbn_code, row_num_list in isbn_index.items()})
+    del isbn_index
+
+    def record_failure(row_num: int, row: List[Any], e: CrawlingError) -> List[Any]:
+        # 실패한 행은 기록하고 원래 내용 그대로 출력
+        logger.warning("can't crawl row %d, %s", row_num, e)
+        failed_row_nums.append(row_num)
+        metrics.inc("rows_total", result="failed")
+        if journal:
+            journal.record_failure(row_num, json.dumps(e.to_dict(), ensure_ascii=False))
+        return row
+
+    def record_error(row_num: int, row: List[Any], e: Exception) -> List[Any]:
+        # 추출 단계의 예외(빈 문서의 파싱 오류, 추출 프로세스의 비정상 종료 등)도 그 행만 실패로 기록함
+        # (ExtractionError는 추출 프로세스에서 발생한 예외의 종류와 메시지를 이미 담고 있음)
+        reason = str(e) if isinstance(e, ExtractionError) else "%s: %s" % (type(e).__name__, e)
+        logger.warning("can't extract row %d, %s", row_num, reason, exc_info=logger.isEnabledFor(logging.DEBUG))
+        failed_row_nums.append(row_num)
+        metrics.inc("rows_total", result="failed")
+        if journal:
+            error = {"message": str(e), "url": "", "status_code": None, "reason": reason, "attempts": 0}
+            journal.record_failure(row_num, json.dumps(error, ensure_ascii=False))
+        return row
+
+    def record_done(row_num: int, new_row: List[Any], result: str = "done") -> List[Any]:
+        metrics.inc("rows_total", result=result)
+        if journal:
+            journal.record_done(row_num, new_row)
+        return new_row
+
+    def complete(row_num: int, row: List[Any], future: Future) -> List[Any]:
+        # 추출 단계가 끝난 뒤에 결과를 기록함
+        try:
+            new_row = future.result()
+        except CrawlingError as e:
+            return record_failure(row_num, row, e)
+        except Exception as e:
+            return record_error(row_num, row, e)
+        return record_done(row_num, new_row)
+
+    def crawl(row_num: int, row: List[Any]) -> Union[List[Any], Future]:
+        if journal:
+            # 이전 실행에서 완료된 행은 저널의 결과로 대체
+            done_row = journal.get_done_row(row_num)
+            if done_row is not None:
+                return done_row
+        isbn_code = plan.get_isbn(row_num)
+        if isbn_code is None:
+            # 계획에서 제외된 행(머리글, 잘못된 ISBN)은 원래 내용 그대로 출력
+            return record_done(row_num, row, "skipped")
+        try:
+            dump_file = os.path.join(context.dump_dir, "%s.%d.%d.html" % (os.path.basename(excel_file), sheet_index, row_num)) if context.dump_dir else None
+            result = crawl_row(context.crawler, context.search_extractor, context.url_prefix, row_num, list(row), isbn_code, description_col_num, memo, context.extraction_pool, dump_file, context.refresher, context.result_store)
+        except CrawlingError as e:
+            return record_failure(row_num, row, e)
+        except Exception as e:
+            return record_error(row_num, row, e)
+        if isinstance(result, Future):
+            return chain_future(result, lambda done_future: complete(row_num, row, done_future))
+        return record_done(row_num, result)
+
+    # 행을 하나씩 읽어서 처리하고 처리된 순서대로 바로 출력 파일에 씀
+    num_extra_pending = context.extraction_pool.max_queued if context.extraction_pool else 0
+    for row_num, row in process_rows(iter_rows(excel_file, sheet_index), crawl, context.num_workers, context.executor, num_extra_pending):
+        with metrics.timer("stage_seconds", stage="write"):
+            writer.write_row(row_num, row)
+    return len(failed_row_nums)
+
+
+def get_sheet_journal_file(journal_file: str, sheet_index: int) -> str:
+    # 첫번째 시트는 지정된 저널 파일을 그대로 쓰고, 나머지 시트는 '<저널 파일>.<시트 번호>'를 씀
+    if sheet_index == 0:
+        return journal_file
+    return "%s.%d" % (journal_file, sheet_index)
+
+
+def process_workbook(context: CrawlingContext, excel_file: str, new_excel_file: str, journal_file: Optional[str] = None, all_sheets: bool = False) -> int:
+    # 워크북을 처리하고 실패한 행의 개수를 반환
+    if all_sheets:
+        sheet_names = get_sheet_names(excel_file)
+    else:
+        sheet_names = ["Sheet1"]
+
+    # xls로 쓸 수 없는 시트는 크롤링하기 전에 알림
+    check_row_limit(excel_file, len(sheet_names), new_excel_file)
+
+    # 다른 워크북의 저널이면 출력 파일을 덮어쓰기 전에 알리도록 시트별 저널을 먼저 엶
+    journal_list: List[Optional[Journal]] = []
+    try:
+        for sheet_index in range(len(sheet_names)):
+            journal_list.append(Journal(get_sheet_journal_file(journal_file, sheet_index), excel_file if sheet_index == 0 else "%s#%d" % (excel_file, sheet_index)) if journal_file else None)
+
+        num_failures = 0
+        writer = make_writer(new_excel_file, sheet_names[0])
+        try:
+            for sheet_index, sheet_name in enumerate(sheet_names):
+                if sheet_index > 0:
+                    writer.add_sheet(sheet_name)
+                logger.info("processing '%s' sheet %d '%s'", excel_file, sheet_index, sheet_name)
+                num_failures += process_sheet(context, excel_file, sheet_index, writer, journal_list[sheet_index])
+        finally:
+            # xls/xlsx는 닫을 때 파일 전체를 저장함
+            with get_metrics().timer("stage_seconds", stage="save"):
+                writer.close()
+    finally:
+        for journal in journal_list:
+            if journal:
+                journal.close()
+    return num_failures
+
+
+def read_excel_file(excel_file: str, num_workers: int = 1, journal_file: Optional[str] = None, new_excel_file: Optional[str] = None, num_extract_workers: int = 0, max_extract_queue: Optional[int] = None, dump_dir: Optional[str] = None) -> int:
+    if not new_excel_file:
+        new_excel_file = os.path.join(os.path.dirname(excel_file), "new_" + os.path.basename(excel_file))
+
+    try:
+        context = CrawlingContext(num_workers, num_extract_workers, max_extract_queue, dump_dir)
+    except ConfigError as e:
+        logger.error("can't read configuration, %s", e)
+        sys.exit(-1)
+
+    with context:
+        try:
+            num_failures = process_workbook(context, excel_file, new_excel_file, journal_file)
         except ValueError as e:
-            do_crawl = False
-        logger.debug("isbn=%s" % isbn_code)
-
-        if do_crawl:
-            url = url_prefix + isbn_code
-            logger.debug("url=%s" % url)
-
-            html = crawler.run(url)
-            #logger.debug("html=%s" % html)
-
-            # ISBN -> bid
-            state = 0
-            for line in html.split('\n'):
-                if state == 0:
-                    m = re.search(r'<ul class="basic" id="searchBiblioList"', line)
-                    if m:
-                        state = 1
-                elif state == 1:
-                    m = re.search(r'<a href="(?P<url>http://book.naver.com/[^"]+)"', line)
-                    if m:
-                        url = m.group("url")
-                        logger.debug(url)
-                        html = crawler.run(url)
-                        do_extract = True
-                        if not html:
-                            logger.warning("can't get response from '%s'" % url)
-                            sys.exit(-1)
-                        break
-
-            if do_extract:
-                row[description_col_num] = extract_element(html)
-                logger.debug("len=%d" % len(row[description_col_num]))
-                #logger.debug("row[description_col_num]=%s" % row[description_col_num])
-                with open("test.%d.html" % row_num, "w") as outfile:
-                    outfile.write(row[description_col_num])
-                    outfile.write("\n")
-
-        for col_num in range(len(row)):
-            new_worksheet.write(row_num, col_num, row[col_num])
-
-        # 테스트용으로 첫번째 건 수행 이후에 종료
-        #if do_crawl:
-            #print(row[description_col_num])
-            #break;
-
-    new_workbook.save(new_excel_file)
+            logger.error("can't process '%s', %s", excel_file, e)
+            return -1
+    if num_failures:
+        logger.warning("%d rows failed, rerun to retry them", num_failures)
+
+    return 0
+
+
+def expand_input_files(path_list: List[str]) -> List[str]:
+    # 디렉토리와 glob 패턴을 워크북 파일 목록으로 펼침 (이전 실행의 출력 파일 new_*는 제외)
+    file_list: List[str] = []
+    for path in path_list:
+        if os.path.isdir(path):
+            candidates = sorted(file for ext in INPUT_FILE_EXTENSIONS for file in glob.glob(os.path.join(path, "*" + ext)))
+        elif any(c in path for c in "*?["):
+            candidates = sorted(glob.glob(path))
+        else:
+            file_list.append(path)
+            continue
+        for file in candidates:
+            if not os.path.basename(file).startswith("new_") and os.path.splitext(file)[1].lower() in INPUT_FILE_EXTENSIONS:
+                file_list.append(file)
+    # 같은 파일이 여러 번 지정되어도 한 번만 처리함
+    return list(dict.fromkeys(file_list))
+
+
+def get_batch_names(excel_file_list: List[str]) -> Dict[str, str]:
+    # 출력 파일과 저널 파일의 이름에 쓸 워크북별 이름으로, 보통은 파일 이름을 그대로 씀
+    # 다른 디렉토리에 같은 이름의 워크북이 있으면, 그 워크북들의 공통 디렉토리로부터의 상대 경로를 '_'로 이어서 씀
+    # (예: supplierA/order.xls, supplierB/order.xls -> supplierA_order.xls, supplierB_order.xls)
+    files_by_basename: Dict[str, List[str]] = {}
+    for excel_file in excel_file_list:
+        files_by_basename.setdefault(os.path.basename(excel_file), []).append(excel_file)
+    name_by_file: Dict[str, str] = {}
+    for basename, file_list in files_by_basename.items():
+        if len(file_list) == 1:
+            name_by_file[file_list[0]] = basename
+            continue
+        common_dir = os.path.commonpath([os.path.dirname(os.path.abspath(file)) for file in file_list])
+        for file in file_list:
+            name_by_file[file] = os.path.relpath(os.path.abspath(file), common_dir).replace(os.sep, "_")
+    return name_by_file
+
+
+def find_name_collisions(path_by_file: Dict[str, str]) -> List[Tuple[str, List[str]]]:
+    # 여러 워크북이 같은 출력 파일이나 저널 파일을 쓰게 되는 경우를 찾음
+    files_by_path: Dict[str, List[str]] = {}
+    for file, path in path_by_file.items():
+        files_by_path.setdefault(os.path.normcase(os.path.abspath(path)), []).append(file)
+    return [(path, file_list) for path, file_list in files_by_path.items() if len(file_list) > 1]
+
+
+def read_excel_files(path_list: List[str], num_workers: int = 1, journal_dir: Optional[str] = None, output_dir: Optional[str] = None, num_extract_workers: int = 0, max_extract_queue: Optional[int] = None, dump_dir: Optional[str] = None) -> int:
+    # 한 프로세스에서 여러 워크북의 모든 시트를 처리하며, 연결 풀과 캐시와 작업자들을 공유함
+    excel_file_list = expand_input_files(path_list)
+    if not excel_file_list:
+        logger.error("can't find any workbook in %s", path_list)
+        return -1
+    logger.info("%d workbooks to process", len(excel_file_list))
+
+    # 워크북마다 다른 출력 파일과 저널 파일을 쓰는지 크롤링하기 전에 확인함
+    name_by_file = get_batch_names(excel_file_list)
+    new_excel_file_by_file = {excel_file: os.path.join(output_dir or os.path.dirname(excel_file), "new_" + name_by_file[excel_file]) for excel_file in excel_file_list}
+    journal_file_by_file = {excel_file: os.path.join(journal_dir, name_by_file[excel_file] + ".journal") for excel_file in excel_file_list} if journal_dir else {}
+    collision_list = find_name_collisions(new_excel_file_by_file) + find_name_collisions(journal_file_by_file)
+    if collision_list:
+        for path, file_list in collision_list:
+            logger.error("workbooks %s would all write '%s'", ", ".join(file_list), path)
+        return -1
+
+    for dir_path in (journal_dir, output_dir):
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
 
+    try:
+        context = CrawlingContext(num_workers, num_extract_workers, max_extract_queue, dump_dir)
+    except ConfigError as e:
+        logger.error("can't read configuration, %s", e)
+        sys.exit(-1)
+
+    num_failures = 0
+    failed_file_list: List[str] = []
+    with context:
+        for excel_file in excel_file_list:
+            new_excel_file = new_excel_file_by_file[excel_file]
+            journal_file = journal_file_by_file.get(excel_file)
+            try:
+                num_failures += process_workbook(context, excel_file, new_excel_file, journal_file, all_sheets=True)
+            except Exception as e:
+                # 워크북 하나가 잘못되어도 나머지 워크북은 계속 처리함
+                logger.error("can't process '%s', %s", excel_file, e)
+                failed_file_list.append(excel_file)
+
+    if num_failures:
+        logger.warning("%d rows failed, rerun to retry them", num_failures)
+    if failed_file_list:
+        logger.error("%d of %d workbooks failed: %s", len(failed_file_list), len(excel_file_list), ", ".join(failed_file_list))
+        return -1
     return 0
 
 
+def print_usage() -> None:
+    print("Usage:\t%s [ -w <num workers> ] [ -e <num extract workers> ] [ -c <journal file> ] [ -o <output file> ] <excel file>" % sys.argv[0])
+    print("\t%s -b [ -w <num workers> ] [ -e <num extract workers> ] [ -c <journal dir> ] [ -o <output dir> ] <excel file, dir or glob> ..." % sys.argv[0])
+    print("\t-w, --workers: number of rows crawled concurrently (default 1)")
+    print("\t-e, --extract-workers: number of processes extracting descriptions from HTML (default 0, in the crawling threads)")
+    print("\t--extract-queue: max number of fetched pages waiting for extraction (default 2 x extract workers)")
+    print("\t-c, --checkpoint: record per-row results in the journal file and resume from it")
+    print("\t-o, --output: output file, .xls/.xlsx/.csv (default new_<excel file>)")
+    print("\t              use .xlsx or .csv for sheets with more than 65536 rows")
+    print("\t-m, --metrics: print per-stage timings, downloaded bytes, cache hits and retries at the end")
+    print("\t--metrics-file: also save the metrics, as JSON if the file ends with .json, otherwise in Prometheus text format")
+    print("\t-d, --debug: write debug logs (including element path tracing) to run.log")
+    print("\t--dump-dir: save each extracted description as <excel file>.<sheet>.<row>.html in the directory")
+    print("\t-b, --batch: process all sheets of every given workbook, directory (*.xls, *.xlsx, *.csv) or glob")
+    print("\t             -c and -o are directories; outputs are new_<excel file> and journals <excel file>.journal")
+    print("\t             (workbooks with the same name in different directories are named by their relative path, e.g. new_supplierA_order.xls)")
+    print()
+
+
 def main() -> int:
-    return read_excel_file(sys.argv[1])
+    init_logging()
+    signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+
+    num_workers = 1
+    num_extract_workers = 0
+    max_extract_queue: Optional[int] = None
+    journal_file: Optional[str] = None
+    new_excel_file: Optional[str] = None
+    batch_mode = False
+    print_metrics = False
+    metrics_file: Optional[str] = None
+    dump_dir: Optional[str] = None
+
+    optlist, args = getopt.getopt(sys.argv[1:], "hw:e:c:o:bmd", ["help", "workers=", "extract-workers=", "checkpoint=", "output=", "batch", "extract-queue=", "metrics", "metrics-file=", "debug", "dump-dir="])
+    for o, a in optlist:
+        if o in ("-h", "--help"):
+            print_usage()
+            return 0
+        elif o in ("-w", "--workers"):
+            num_workers = int(a)
+        elif o in ("-e", "--extract-workers"):
+            num_extract_workers = int(a)
+        elif o == "--extract-queue":
+            max_extract_queue = int(a)
+        elif o in ("-c", "--checkpoint"):
+            journal_file = a
+        elif o in ("-o", "--output"):
+            new_excel_file = a
+        elif o in ("-b", "--batch"):
+            batch_mode = True
+        elif o in ("-m", "--metrics"):
+            print_metrics = True
+        elif o == "--metrics-file":
+            metrics_file = a
+        elif o in ("-d", "--debug"):
+            logger.setLevel(logging.DEBUG)
+        elif o == "--dump-dir":
+            dump_dir = a
+
+    if len(args) < 1:
+        print_usage()
+        return -1
+
+    metrics = get_metrics()
+    if print_metrics or metrics_file:
+        metrics.enable()
+
+    if batch_mode:
+        result = read_excel_files(args, num_workers, journal_file, new_excel_file, num_extract_workers, max_extract_queue, dump_dir)
+    else:
+        result = read_excel_file(args[0], num_workers, journal_file, new_excel_file, num_extract_workers, max_extract_queue, dump_dir)
+
+    if print_metrics:
+        logger.info("run metrics:\n%s", metrics.get_summary())
+    if metrics_file:
+        metrics.export(metrics_file)
+    return result
 
 
 if __name__ == "__main__":
@@ -2,49 +2,52 @@
 # -*- coding: utf-8 -*-
 
 import os
-import re
 import sys
-import signal
 import logging
-import logging.config
-from bs4 import BeautifulSoup
-from util import Config, IO, HTMLExtractor
-from pprint import pprint
+from typing import Dict, Mapping, Any
+from util import get_collection_config, init_logging, IO, HTMLExtractor
+from sanitizer import get_sanitizer
 
 
-logging.config.fileConfig("logging.conf")
 logger = logging.getLogger()
-signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+
+
+def init_worker() -> None:
+    # 추출용 프로세스가 시작될 때 설정을 읽고 셀렉터를 미리 컴파일해서, 이후의 extract_element() 호출에서 재사용함
+    init_logging()
+    collection_conf = get_collection_config()
+    element_list = collection_conf.element_list
+    get_sanitizer(collection_conf.sanitize_rules, collection_conf.sanitize_delete_chars)
+    if collection_conf.parser_engine == "lxml":
+        from lxml_extractor import get_lxml_extractor
+        get_lxml_extractor(element_list)
+    elif "element_path" in element_list:
+        HTMLExtractor.compile_path(element_list["element_path"])
 
 
 def extract_element(html: str) -> int:
     logger.debug("# extract_element()")
 
-    result_content: str = ""
-
     # configuration
-    config = Config()
-    if not config:
-        logger.error("can't read configuration")
-        sys.exit(-1)
-
-    collection_conf = config.get_collection_configs()
-    if not collection_conf:
-        logger.error("can't get collection configuration")
-        sys.exit(-1)
-
-    #id_list = collection_conf["element_id_list"]
-    #class_list = collection_conf["element_class_list"]
-    #path_list = collection_conf["element_path_list"]
-    element_list = collection_conf["element_list"][0]
-    encoding = collection_conf["encoding"]
-    logger.debug("# encoding: %r" % encoding)
+    collection_conf = get_collection_config()
+    element_list = collection_conf.element_list
+    parser_engine = collection_conf.parser_engine
+    logger.debug("# encoding: %r", collection_conf.encoding)
 
     # sanitize
-    html = re.sub(r'alt="(.*)<br>(.*)"', r'alt="\1 \2"', html)
-    html = re.sub(r'<br>', r'<br/>', html)
-    html = re.sub(r'[\x01\x08]', '', html, re.LOCALE)
-    html = re.sub(r'<\?xml[^>]+>', r'', html)
+    html = get_sanitizer(collection_conf.sanitize_rules, collection_conf.sanitize_delete_chars).sanitize(html)
+
+    if parser_engine == "lxml":
+        # lxml로 직접 파싱하고, 미리 컴파일된 XPath 셀렉터를 재사용함
+        from lxml_extractor import get_lxml_extractor
+        return get_lxml_extractor(element_list).extract(html)
+    return extract_with_soup(html, element_list)
+
+
+def extract_with_soup(html: str, element_list: Mapping[str, Any]) -> str:
+    from bs4 import BeautifulSoup
+
+    result_content: str = ""
 
     for parser in ["html.parser"]:
         soup = BeautifulSoup(html, parser)
@@ -55,7 +58,7 @@ def extract_element(html: str) -> int:
         for element_spec in element_list:
             if element_spec == "element_path":
                 path_str = element_list[element_spec]
-                divs = HTMLExtractor.get_node_with_path(soup, path_str)
+                divs = HTMLExtractor.compile_path(path_str).run(soup)
             elif element_spec == "element_class":
                 class_str = element_list[element_spec]
                 divs = soup.find_all(class_=class_str)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+
+
+import time
+import threading
+import logging
+from concurrent.futures import Future
+from typing import Callable, Optional, Any
+
+from extract_element import extract_element, init_worker
+from metrics import get_metrics
+
+
+logger = logging.getLogger()
+
+
+class ExtractionError(Exception):
+    pass
+
+
+def extract_in_worker(html: str) -> str:
+    # 작업 프로세스에서 발생한 예외는 피클로 돌려받는데, lxml의 ParserError처럼 피클할 수 없는 예외는
+    # 원래 예외 대신 TypeError가 되므로, 예외의 종류와 메시지를 담은 ExtractionError로 바꿔서 돌려줌
+    try:
+        return extract_element(html)
+    except Exception as e:
+        raise ExtractionError("%s: %s" % (type(e).__name__, e)) from None
+
+
+def chain_future(future: Future, func: Callable[[Future], Any]) -> Future:
+    # future가 끝나면 func(future)의 결과(또는 예외)를 가지는 새로운 Future
+    new_future: Future = Future()
+
+    def callback(done_future: Future) -> None:
+        try:
+            new_future.set_result(func(done_future))
+        except BaseException as e:
+            new_future.set_exception(e)
+
+    future.add_done_callback(callback)
+    return new_future
+
+
+class ExtractionPool:
+    # 가져오기 단계에서 받은 HTML을 추출용 프로세스들에 넘기는 추출 단계
+    def __init__(self, num_workers: int, max_queued: Optional[int] = None) -> None:
+        # 추출을 기다리는 HTML은 최대 max_queued개로 제한하며, 가득 차면 submit()이 기다림
+        self.max_queued = max_queued if max_queued else num_workers * 2
+        self._slots = threading.BoundedSemaphore(self.max_queued)
+        # 작업 프로세스는 시작할 때 설정과 셀렉터를 한 번만 준비하고, 추출된 문자열만 돌려줌
+        # (multiprocessing은 추출 단계를 쓸 때만 읽어들임)
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # 작업 프로세스는 첫 submit()에서 만들어지는데, 그때는 가져오기 스레드들이 로깅이나 SQLite의 잠금을 잡고 있을 수 있음
+        # fork로 만들면 잡힌 잠금이 복사되어 교착될 수 있으므로, 스레드가 없는 별도의 서버 프로세스(forkserver)에서 만듦
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self._executor = ProcessPoolExecutor(max_workers=num_workers, mp_context=multiprocessing.get_context(start_method), initializer=init_worker)
+        logger.debug("extraction pool started, workers=%d, max_queued=%d, start_method=%s", num_workers, self.max_queued, start_method)
+
+    def __enter__(self) -> "ExtractionPool":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._executor.shutdown()
+
+    def submit(self, html: str) -> Future:
+        submitted_at = time.perf_counter()
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(extract_in_worker, html)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        metrics = get_metrics()
+        if metrics.enabled:
+            # 작업 프로세스 안의 측정값은 모을 수 없으므로, 큐에서 기다린 시간을 포함한 전체 시간을 기록함
+            future.add_done_callback(lambda _: metrics.observe("stage_seconds", time.perf_counter() - submitted_at, stage="extract_pool"))
+        return future
+
+    def extract(self, html: str) -> str:
+        return self.submit(html).result()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+
+
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+import logging
+from typing import Dict, List, Tuple, Optional, Any
+from util import make_path
+
+
+logger = logging.getLogger()
+
+
+class CacheEntry:
+    def __init__(self, key: str, url: str, text: str, etag: Optional[str], last_modified: Optional[str], stored_at: float, size: int) -> None:
+        self.key = key
+        self.url = url
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+        self.size = size
+
+    def is_fresh(self, ttl: float, now: Optional[float] = None) -> bool:
+        if now is None:
+            now = time.time()
+        return now - self.stored_at < ttl
+
+    def get_validator_headers(self) -> Dict[str, str]:
+        # 조건부 재검증(conditional revalidation)에 사용할 헤더
+        headers: Dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HTTPCache:
+    # 캐시 키에 반영할 요청 헤더 (응답 내용이 달라질 수 있는 헤더만)
+    DEFAULT_VARY_HEADERS = ("Accept", "Accept-Language")
+
+    def __init__(self, cache_dir: str, ttl: float = 86400, max_size: int = 512 * 1024 * 1024, vary_headers: Tuple[str, ...] = DEFAULT_VARY_HEADERS) -> None:
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_size = max_size
+        self.vary_headers = vary_headers
+        make_path(cache_dir)
+        self.db_file = os.path.join(cache_dir, "http_cache.db")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_file, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self._total_size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def __enter__(self) -> "HTTPCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def make_key(self, method: str, url: str, headers: Optional[Dict[str, str]] = None) -> str:
+        key_str = method + " " + url
+        if headers:
+            lowered_headers = {k.lower(): v for k, v in headers.items()}
+            for header in self.vary_headers:
+                key_str += "\n%s: %s" % (header.lower(), lowered_headers.get(header.lower(), ""))
+        return hashlib.sha1(key_str.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute("SELECT url, body, etag, last_modified, stored_at, size FROM entries WHERE key = ?", (key,)).fetchone()
+            if not row:
+                return None
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        url, body, etag, last_modified, stored_at, size = row
+        return CacheEntry(key, url, body.decode("utf-8"), etag, last_modified, stored_at, size)
+
+    def put(self, key: str, url: str, text: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        body = text.encode("utf-8")
+        size = len(body)
+        if size > self.max_size:
+            logger.debug("too large to cache, url=%s, size=%d", url, size)
+            return
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            old_size = row[0] if row else 0
+            self._conn.execute("INSERT OR REPLACE INTO entries (key, url, body, etag, last_modified, stored_at, last_access, size) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                               (key, url, body, etag, last_modified, now, now, size))
+            self._total_size += size - old_size
+            self._evict()
+
+    def refresh(self, key: str) -> None:
+        # 304 Not Modified 응답을 받으면 저장 시각만 갱신하여 TTL을 연장함
+        now = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE entries SET stored_at = ?, last_access = ? WHERE key = ?", (now, now, key))
+
+    def _evict(self) -> None:
+        # 용량 한도를 넘으면 가장 오래전에 사용된 항목부터 제거(LRU)
+        if self._total_size <= self.max_size:
+            return
+        cursor = self._conn.execute("SELECT key, size FROM entries ORDER BY last_access ASC")
+        evicted_keys: List[Tuple[str]] = []
+        for key, size in cursor:
+            if self._total_size <= self.max_size:
+                break
+            evicted_keys.append((key,))
+            self._total_size -= size
+        cursor.close()
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", evicted_keys)
+        logger.debug("evicted %d cache entries, total_size=%d", len(evicted_keys), self._total_size)
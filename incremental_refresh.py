@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+
+
+import time
+import sqlite3
+import threading
+import logging
+from typing import Dict, Optional, Any
+
+from crawler import Crawler, CrawlingError, ConditionalResponse, Method
+from metrics import get_metrics
+from util import URL
+
+
+logger = logging.getLogger()
+
+
+class PageState:
+    # 상세 페이지의 검증자(ETag, Last-Modified, 본문 길이와 해시)와 마지막으로 추출된 설명
+    # fingerprint는 설명을 추출할 때 쓴 설정의 해시 (CollectionConfig.get_fingerprint())
+    def __init__(self, url: str, etag: Optional[str], last_modified: Optional[str], content_length: Optional[int], content_md5: Optional[str], description: Optional[str], checked_at: float, fingerprint: Optional[str] = None) -> None:
+        self.url = url
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_length = content_length
+        self.content_md5 = content_md5
+        self.description = description
+        self.checked_at = checked_at
+        self.fingerprint = fingerprint
+
+    def has_validators(self) -> bool:
+        return bool(self.etag or self.last_modified)
+
+
+class RefreshStore:
+    def __init__(self, store_file: str) -> None:
+        self.store_file = store_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(store_file, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_length INTEGER,
+                content_md5 TEXT,
+                description TEXT,
+                checked_at REAL NOT NULL,
+                fingerprint TEXT
+            )""")
+        # fingerprint 열이 없던 이전 파일에 열을 추가하며, 기존 항목은 설정이 바뀐 것으로 간주되어 다시 추출됨
+        column_names = {row[1] for row in self._conn.execute("PRAGMA table_info(pages)")}
+        if "fingerprint" not in column_names:
+            self._conn.execute("ALTER TABLE pages ADD COLUMN fingerprint TEXT")
+
+    def __enter__(self) -> "RefreshStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get(self, url: str) -> Optional[PageState]:
+        with self._lock:
+            row = self._conn.execute("SELECT url, etag, last_modified, content_length, content_md5, description, checked_at, fingerprint FROM pages WHERE url = ?", (url,)).fetchone()
+        if not row:
+            return None
+        return PageState(*row)
+
+    def put(self, state: PageState) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO pages (url, etag, last_modified, content_length, content_md5, description, checked_at, fingerprint) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                               (state.url, state.etag, state.last_modified, state.content_length, state.content_md5, state.description, state.checked_at, state.fingerprint))
+
+    def touch(self, url: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE pages SET checked_at = ? WHERE url = ?", (time.time(), url))
+
+
+class RefreshResult:
+    # html이 있으면 바뀐 페이지이므로 다시 추출해야 하고, 없으면 state.description을 그대로 쓰면 됨
+    def __init__(self, state: PageState, html: Optional[str] = None) -> None:
+        self.state = state
+        self.html = html
+
+    @property
+    def is_changed(self) -> bool:
+        return self.html is not None
+
+
+class IncrementalRefresher:
+    # HEAD를 지원하지 않는 서버의 응답 코드
+    HEAD_NOT_SUPPORTED_STATUS_CODES = (405, 501)
+
+    def __init__(self, crawler: Crawler, store: RefreshStore, use_head: bool = False, fingerprint: Optional[str] = None) -> None:
+        self.crawler = crawler
+        self.store = store
+        # 서버가 조건부 GET을 지원하지 않을 때, 먼저 HEAD로 검증자만 받아서 비교함
+        self.use_head = use_head
+        # 다른 설정으로 추출된 설명은 페이지가 바뀌지 않았어도 다시 추출함
+        self.fingerprint = fingerprint
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {}
+
+    def _count(self, result: str) -> None:
+        with self._lock:
+            self.counts[result] = self.counts.get(result, 0) + 1
+        get_metrics().inc("refresh_total", result=result)
+
+    def fetch(self, url: str) -> RefreshResult:
+        state = self.store.get(url)
+        is_stale = state is not None and state.fingerprint != self.fingerprint
+        if state is not None and state.description is not None and not is_stale:
+            # 본문 길이만으로는 바뀌지 않았다고 판단할 수 없으므로 ETag나 Last-Modified가 있을 때만 HEAD를 보냄
+            if self.use_head and state.has_validators():
+                head = self.probe_head(url, state)
+                if head and (head.not_modified or IncrementalRefresher.is_same_page(state, head.etag, head.last_modified, head.content_length)):
+                    return self._unchanged(state, "head")
+
+            response = self.crawler.run_conditional(url, state.etag, state.last_modified)
+            if response.not_modified:
+                return self._unchanged(state, "not_modified")
+            content_md5 = URL.get_short_md5_name(response.text)
+            if content_md5 == state.content_md5:
+                # 검증자는 바뀌었지만 본문이 같으면 추출하지 않고, 새 검증자만 저장함
+                self.store.put(PageState(url, response.etag, response.last_modified, response.content_length, content_md5, state.description, time.time(), state.fingerprint))
+                return self._unchanged(state, "same_content")
+            self._count("changed")
+        else:
+            response = self.crawler.run_conditional(url)
+            content_md5 = URL.get_short_md5_name(response.text)
+            if is_stale:
+                logger.debug("extracted with a different configuration, url=%s", url)
+            self._count("changed" if is_stale else "new")
+
+        return RefreshResult(PageState(url, response.etag, response.last_modified, response.content_length, content_md5, None, time.time(), self.fingerprint), response.text)
+
+    def probe_head(self, url: str, state: PageState) -> Optional[ConditionalResponse]:
+        # HEAD 요청이 실패하면 None을 반환해서 조건부 GET으로 넘어가며, 서버가 HEAD를 지원하지 않으면 이후에는 HEAD를 보내지 않음
+        try:
+            return self.crawler.run_conditional(url, state.etag, state.last_modified, Method.HEAD)
+        except CrawlingError as e:
+            if e.status_code in IncrementalRefresher.HEAD_NOT_SUPPORTED_STATUS_CODES:
+                with self._lock:
+                    if self.use_head:
+                        logger.warning("server doesn't support HEAD (status %d), using conditional GET only", e.status_code)
+                    self.use_head = False
+            else:
+                logger.debug("HEAD failed, falling back to conditional GET, %s", e)
+            self._count("head_failed")
+            return None
+
+    def _unchanged(self, state: PageState, result: str) -> RefreshResult:
+        logger.debug("unchanged (%s), url=%s", result, state.url)
+        self.store.touch(state.url)
+        self._count(result)
+        return RefreshResult(state)
+
+    def save(self, result: RefreshResult, description: Optional[str]) -> None:
+        # 바뀐 페이지에서 새로 추출한 설명을 검증자와 함께 저장함
+        result.state.description = description
+        self.store.put(result.state)
+
+    @staticmethod
+    def is_same_page(state: PageState, etag: Optional[str], last_modified: Optional[str], content_length: Optional[int]) -> bool:
+        # HEAD 응답에 ETag나 Last-Modified가 하나라도 있고, 있는 것은 모두 저장된 값과 같아야 같은 페이지로 간주함
+        # 본문 길이는 바뀐 것을 알아내는 데만 씀 (연도나 가격처럼 길이가 같은 수정이 있으므로 같다는 근거가 되지 못함)
+        pairs = [(state.etag, etag), (state.last_modified, last_modified)]
+        compared = [(stored, received) for stored, received in pairs if received is not None]
+        if not compared or any(stored != received for stored, received in compared):
+            return False
+        return state.content_length is None or content_length is None or state.content_length == content_length
+
+    def get_summary(self) -> str:
+        with self._lock:
+            return ", ".join("%s=%d" % (result, count) for result, count in sorted(self.counts.items()))
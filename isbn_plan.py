@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+
+import re
+import logging
+from typing import Dict, List, Tuple, Iterable, Optional, Any
+
+
+logger = logging.getLogger()
+
+
+# 크롤링하지 않는 행의 사유
+SKIP_EMPTY = "empty"
+SKIP_NO_ISBN = "no_isbn"
+SKIP_BAD_LENGTH = "bad_length"
+SKIP_BAD_PREFIX = "bad_prefix"
+SKIP_BAD_CHECKSUM = "bad_checksum"
+
+# 숫자로 저장된 셀의 값(9791189825881.0)의 소수점 부분
+_FLOAT_SUFFIX_PATTERN = re.compile(r'\.0$')
+# 구분자를 지운 뒤의 ISBN 후보 (ISBN-10은 마지막 자리가 X일 수 있음)
+_ISBN_CANDIDATE_PATTERN = re.compile(r'[0-9]{9,}[Xx]?')
+_SEPARATOR_TABLE = str.maketrans("", "", "- ")
+_DIGIT_VALUES = {c: i for i, c in enumerate("0123456789")}
+_DIGIT_VALUES["X"] = _DIGIT_VALUES["x"] = 10
+_ISBN13_WEIGHTS = (1, 3) * 6
+_ISBN10_WEIGHTS = tuple(range(10, 0, -1))
+
+
+def get_isbn13_check_digit(first_12_digits: str) -> str:
+    total = sum(int(d) * w for d, w in zip(first_12_digits, _ISBN13_WEIGHTS))
+    return str((10 - total % 10) % 10)
+
+
+def normalize_isbn(value: Any) -> Tuple[Optional[str], Optional[str]]:
+    # 셀 값을 ISBN-13으로 정규화해서 (ISBN, None)을, 크롤링할 수 없으면 (None, 사유)를 반환
+    isbn = _FLOAT_SUFFIX_PATTERN.sub("", str(value).strip()).translate(_SEPARATOR_TABLE)
+    if not isbn:
+        return None, SKIP_EMPTY
+    m = _ISBN_CANDIDATE_PATTERN.search(isbn)
+    if not m:
+        return None, SKIP_NO_ISBN
+    isbn = m.group(0)
+
+    if len(isbn) == 13 and isbn[-1] not in "Xx":
+        if not isbn.startswith(("978", "979")):
+            return None, SKIP_BAD_PREFIX
+        if isbn[-1] != get_isbn13_check_digit(isbn[:12]):
+            return None, SKIP_BAD_CHECKSUM
+        return isbn, None
+    if len(isbn) == 10:
+        if sum(_DIGIT_VALUES[c] * w for c, w in zip(isbn, _ISBN10_WEIGHTS)) % 11 != 0:
+            return None, SKIP_BAD_CHECKSUM
+        # ISBN-10 => 978로 시작하는 ISBN-13
+        isbn = "978" + isbn[:9]
+        return isbn + get_isbn13_check_digit(isbn), None
+    return None, SKIP_BAD_LENGTH
+
+
+class IsbnPlan:
+    # 시트의 ISBN 열을 한 번에 정규화하고 검증한 결과로, 크롤링할 행과 건너뛸 행(사유)을 가짐
+    def __init__(self) -> None:
+        self.isbn_by_row: Dict[int, str] = {}
+        self.skip_reason_by_row: Dict[int, str] = {}
+
+    def get_isbn(self, row_num: int) -> Optional[str]:
+        return self.isbn_by_row.get(row_num)
+
+    def get_skip_reason(self, row_num: int) -> Optional[str]:
+        return self.skip_reason_by_row.get(row_num)
+
+    def get_isbn_index(self) -> Dict[str, List[int]]:
+        # 정규화된 ISBN => 행 번호 목록
+        isbn_index: Dict[str, List[int]] = {}
+        for row_num, isbn in self.isbn_by_row.items():
+            isbn_index.setdefault(isbn, []).append(row_num)
+        return isbn_index
+
+    def get_skip_counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for reason in self.skip_reason_by_row.values():
+            counts[reason] = counts.get(reason, 0) + 1
+        return counts
+
+    def get_summary(self) -> str:
+        num_isbns = len(set(self.isbn_by_row.values()))
+        skip_counts = ", ".join("%s=%d" % (reason, count) for reason, count in sorted(self.get_skip_counts().items()))
+        return "%d rows to crawl (%d distinct ISBNs), %d rows skipped%s" % (len(self.isbn_by_row), num_isbns, len(self.skip_reason_by_row), " (%s)" % skip_counts if skip_counts else "")
+
+
+def make_isbn_plan(rows: Iterable[Tuple[int, List[Any]]], isbn_col_num: int = 0) -> IsbnPlan:
+    # ISBN 열만 먼저 모은 뒤 한 번에 정규화해서, 크롤링하기 전에 잘못된 행을 걸러냄
+    row_num_list: List[int] = []
+    value_list: List[Any] = []
+    for row_num, row in rows:
+        row_num_list.append(row_num)
+        value_list.append(row[isbn_col_num] if len(row) > isbn_col_num else "")
+
+    # 같은 값이 여러 행에 있으면 한 번만 검증함
+    result_by_value = {value: normalize_isbn(value) for value in set(value_list)}
+    plan = IsbnPlan()
+    for row_num, value in zip(row_num_list, value_list):
+        isbn, reason = result_by_value[value]
+        if isbn is not None:
+            plan.isbn_by_row[row_num] = isbn
+        else:
+            plan.skip_reason_by_row[row_num] = reason
+            logger.debug("row %d skipped, %s, value=%r", row_num, reason, value)
+    return plan
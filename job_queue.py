@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+
+
+import time
+import sqlite3
+import importlib
+import threading
+import logging
+from typing import Dict, List, Sequence, Callable, Optional, Any
+
+
+logger = logging.getLogger()
+
+
+class Job:
+    STATUS_QUEUED = "queued"
+    STATUS_LEASED = "leased"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+
+    def __init__(self, job_id: int, url_prefix: str, isbn: str, status: str = STATUS_QUEUED, attempts: int = 0, description: Optional[str] = None, error: Optional[str] = None, fingerprint: Optional[str] = None) -> None:
+        self.job_id = job_id
+        self.url_prefix = url_prefix
+        self.isbn = isbn
+        self.status = status
+        self.attempts = attempts
+        # 완료된 작업에서 추출된 설명 (검색 결과가 없으면 None)
+        self.description = description
+        self.error = error
+        # 설명을 추출할 설정의 해시 (CollectionConfig.get_fingerprint())로, 완료된 작업에서는 작업자가 실제로 쓴 설정의 해시
+        self.fingerprint = fingerprint
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (Job.STATUS_DONE, Job.STATUS_FAILED)
+
+
+class JobQueue:
+    # (url_prefix, ISBN) 조회 작업의 큐
+    # 작업자는 lease()로 받은 작업을 lease_seconds 안에 complete() 또는 fail()로 끝내야 하며, 그렇지 못하면 다른 작업자가 다시 받음
+    def __enter__(self) -> "JobQueue":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def enqueue(self, url_prefix: str, isbn_list: Sequence[str], fingerprint: Optional[str] = None) -> List[int]:
+        # ISBN마다 작업 번호를 반환하며, 같은 (url_prefix, ISBN)의 작업이 이미 있으면 그 작업 번호를 반환함
+        # 완료된 작업은 fingerprint가 같고 결과가 만료되지 않았을 때만 그대로 쓰고, 아니면 다시 큐에 넣음
+        raise NotImplementedError
+
+    def lease(self, worker_id: str) -> Optional[Job]:
+        # 받을 작업이 없으면 None
+        raise NotImplementedError
+
+    def complete(self, job_id: int, worker_id: str, description: Optional[str], fingerprint: Optional[str] = None) -> bool:
+        # 그 사이에 작업을 다른 작업자에게 빼앗겼으면 False
+        raise NotImplementedError
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> bool:
+        raise NotImplementedError
+
+    def get_jobs(self, job_id_list: Sequence[int]) -> Dict[int, Job]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        raise NotImplementedError
+
+
+class SqliteJobQueue(JobQueue):
+    # 한 노드의 여러 프로세스가 같은 파일을 공유하는 큐 (네트워크 파일 시스템에서는 SQLite 잠금을 믿을 수 없음)
+    # 여러 노드에서 작업자를 돌리려면 공유 브로커를 쓰는 JobQueue 구현을 <backend>에 지정함
+    # 한 번에 조회하는 작업 번호의 수 (SQLite의 인자 개수 제한보다 작아야 함)
+    MAX_QUERY_PARAMS = 500
+
+    def __init__(self, queue_file: str, lease_seconds: float = 300, max_attempts: int = 3, result_ttl: float = 0) -> None:
+        self.queue_file = queue_file
+        self.lease_seconds = lease_seconds
+        # 실패하거나 작업자가 죽어서 임대가 만료된 작업을 다시 시도하는 최대 횟수
+        self.max_attempts = max_attempts
+        # 완료된 작업의 결과를 다시 쓰는 기간(초)으로, 0이면 만료되지 않음
+        self.result_ttl = result_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(queue_file, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url_prefix TEXT NOT NULL,
+                isbn TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker_id TEXT,
+                lease_expires_at REAL,
+                description TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                fingerprint TEXT,
+                UNIQUE (url_prefix, isbn)
+            )""")
+        # fingerprint 열이 없던 이전 파일에 열을 추가하며, 기존의 완료된 작업은 다음에 큐에 넣을 때 다시 처리됨
+        column_names = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "fingerprint" not in column_names:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN fingerprint TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, job_id)")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _transaction(self, func: Callable[[], Any]) -> Any:
+        # 다른 프로세스와 같은 작업을 동시에 받지 않도록 쓰기 잠금을 먼저 잡음
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = func()
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def enqueue(self, url_prefix: str, isbn_list: Sequence[str], fingerprint: Optional[str] = None) -> List[int]:
+        def run() -> List[int]:
+            now = time.time()
+            expired_before = now - self.result_ttl if self.result_ttl > 0 else 0
+            job_id_list: List[int] = []
+            for isbn in isbn_list:
+                # 끝내 실패했던 작업과, 다른 설정으로 추출되었거나 만료된 완료 작업은 다시 큐에 넣고, 나머지 완료된 작업은 결과를 그대로 씀
+                self._conn.execute("""
+                    INSERT INTO jobs (url_prefix, isbn, status, fingerprint, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (url_prefix, isbn) DO UPDATE SET status = excluded.status, attempts = 0, description = NULL, error = NULL, fingerprint = excluded.fingerprint, updated_at = excluded.updated_at
+                    WHERE status = ? OR (status = ? AND (fingerprint IS NOT excluded.fingerprint OR updated_at < ?))""",
+                                   (url_prefix, isbn, Job.STATUS_QUEUED, fingerprint, now, now, Job.STATUS_FAILED, Job.STATUS_DONE, expired_before))
+                job_id_list.append(self._conn.execute("SELECT job_id FROM jobs WHERE url_prefix = ? AND isbn = ?", (url_prefix, isbn)).fetchone()[0])
+            return job_id_list
+        return self._transaction(run)
+
+    def lease(self, worker_id: str) -> Optional[Job]:
+        def run() -> Optional[Job]:
+            now = time.time()
+            # 최대 횟수만큼 임대가 만료된 작업은 더 이상 시도하지 않음
+            self._conn.execute("UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE status = ? AND lease_expires_at < ? AND attempts >= ?",
+                               (Job.STATUS_FAILED, "lease expired %d times" % self.max_attempts, now, Job.STATUS_LEASED, now, self.max_attempts))
+            row = self._conn.execute("""
+                SELECT job_id, url_prefix, isbn, attempts, fingerprint FROM jobs
+                WHERE status = ? OR (status = ? AND lease_expires_at < ?)
+                ORDER BY job_id LIMIT 1""", (Job.STATUS_QUEUED, Job.STATUS_LEASED, now)).fetchone()
+            if not row:
+                return None
+            job_id, url_prefix, isbn, attempts, fingerprint = row
+            self._conn.execute("UPDATE jobs SET status = ?, attempts = ?, worker_id = ?, lease_expires_at = ?, updated_at = ? WHERE job_id = ?",
+                               (Job.STATUS_LEASED, attempts + 1, worker_id, now + self.lease_seconds, now, job_id))
+            return Job(job_id, url_prefix, isbn, Job.STATUS_LEASED, attempts + 1, fingerprint=fingerprint)
+        return self._transaction(run)
+
+    def complete(self, job_id: int, worker_id: str, description: Optional[str], fingerprint: Optional[str] = None) -> bool:
+        with self._lock:
+            cursor = self._conn.execute("UPDATE jobs SET status = ?, description = ?, error = NULL, fingerprint = ?, lease_expires_at = NULL, updated_at = ? WHERE job_id = ? AND worker_id = ? AND status = ?",
+                                        (Job.STATUS_DONE, description, fingerprint, time.time(), job_id, worker_id, Job.STATUS_LEASED))
+            return cursor.rowcount > 0
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> bool:
+        # 남은 시도 횟수가 있으면 다시 큐에 넣음
+        with self._lock:
+            cursor = self._conn.execute("UPDATE jobs SET status = CASE WHEN attempts < ? THEN ? ELSE ? END, error = ?, lease_expires_at = NULL, updated_at = ? WHERE job_id = ? AND worker_id = ? AND status = ?",
+                                        (self.max_attempts, Job.STATUS_QUEUED, Job.STATUS_FAILED, error, time.time(), job_id, worker_id, Job.STATUS_LEASED))
+            return cursor.rowcount > 0
+
+    def get_jobs(self, job_id_list: Sequence[int]) -> Dict[int, Job]:
+        jobs: Dict[int, Job] = {}
+        job_id_list = list(job_id_list)
+        with self._lock:
+            for i in range(0, len(job_id_list), SqliteJobQueue.MAX_QUERY_PARAMS):
+                chunk = job_id_list[i:i + SqliteJobQueue.MAX_QUERY_PARAMS]
+                query = "SELECT job_id, url_prefix, isbn, status, attempts, description, error, fingerprint FROM jobs WHERE job_id IN (%s)" % ",".join("?" * len(chunk))
+                for row in self._conn.execute(query, chunk):
+                    jobs[row[0]] = Job(*row)
+        return jobs
+
+
+def make_sqlite_job_queue(conf: Dict[str, Any]) -> JobQueue:
+    return SqliteJobQueue(conf["queue_file"], conf["lease_seconds"], conf["max_attempts"], conf["result_ttl"])
+
+
+# <backend> 이름 => <job_queue> 설정을 받아 큐를 만드는 함수
+JOB_QUEUE_BACKENDS: Dict[str, Callable[[Dict[str, Any]], JobQueue]] = {
+    "sqlite": make_sqlite_job_queue,
+}
+
+
+def make_job_queue(conf: Dict[str, Any]) -> JobQueue:
+    # <backend>가 등록된 이름이 아니면 'module:function' 형태로 보고, 그 함수를 <job_queue> 설정으로 호출해서 큐를 만듦
+    backend = conf["backend"]
+    factory = JOB_QUEUE_BACKENDS.get(backend)
+    if factory is None:
+        if ":" not in backend:
+            raise ValueError("unknown job queue backend '%s'" % backend)
+        module_name, func_name = backend.split(":", 1)
+        factory = getattr(importlib.import_module(module_name), func_name)
+    return factory(conf)
@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import re
+import threading
+import logging
+from typing import Dict, List, Tuple, Mapping, Union, Optional, Any
+import lxml.html
+from lxml import etree
+
+from util import HTMLExtractor, PathQuery
+
+
+logger = logging.getLogger()
+
+
+# BeautifulSoup이 <br/>처럼 닫는 태그 없이 출력하는 태그
+VOID_ELEMENTS = frozenset(["area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link", "menuitem", "meta", "param", "source", "track", "wbr", "basefont", "bgsound", "command", "frame", "image", "isindex", "nextid", "spacer"])
+# BeautifulSoup이 내용을 이스케이프하지 않는 태그
+CDATA_CONTAINING_ELEMENTS = frozenset(["script", "style"])
+# BeautifulSoup이 공백 문자열을 줄이지 않는 태그
+PRESERVE_WHITESPACE_ELEMENTS = frozenset(["pre", "textarea"])
+ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+# 태그와 script/style 내용을 제외한 텍스트 안의 CR 문자
+CARRIAGE_RETURN_IN_TEXT_PATTERN = re.compile(r'(<script.*?</script>|<style.*?</style>|<[^>]*>)|\r', re.DOTALL | re.IGNORECASE)
+# BeautifulSoup의 tag.text가 (그 태그 자신이 아니면) 내용을 제외하는 태그
+TEXT_EXCLUDED_ELEMENTS = frozenset(["script", "style", "template"])
+# 문서에 <html> 태그가 있는지 (없으면 lxml이 <html>, <head>, <body>를 만들어 넣음)
+HTML_TAG_PATTERN = re.compile(r'<html[\s>]', re.IGNORECASE)
+# BeautifulSoup이 공백으로 나눈 뒤 한 칸 공백으로 다시 합쳐서 출력하는 속성
+MULTI_VALUED_ATTRIBUTES: Dict[str, Tuple[str, ...]] = {
+    "*": ("class", "accesskey", "dropzone"),
+    "a": ("rel", "rev"),
+    "link": ("rel", "rev"),
+    "td": ("headers",),
+    "th": ("headers",),
+    "form": ("accept-charset",),
+    "object": ("archive",),
+    "area": ("rel",),
+    "icon": ("sizes",),
+    "iframe": ("sandbox",),
+    "output": ("for",),
+}
+
+
+def _xpath_literal(value: str) -> str:
+    if "'" not in value:
+        return "'%s'" % value
+    if '"' not in value:
+        return '"%s"' % value
+    return "concat(%s)" % ", \"'\", ".join("'%s'" % part for part in value.split("'"))
+
+
+def _to_value_list(value: Any) -> List[str]:
+    # 같은 이름의 설정이 여러 개면 xmltodict가 리스트로 만들어 줌
+    if isinstance(value, list):
+        return [str(v) for v in value]
+    return [str(value)]
+
+
+def _escape_text(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _protect_carriage_return(m) -> str:
+    if m.group(1):
+        return m.group(1)
+    return "&#13;"
+
+
+def _collapse_whitespace(text: str) -> str:
+    # BeautifulSoup은 공백으로만 이루어진 문자열을 줄바꿈 하나나 공백 하나로 줄임
+    if text.strip(ASCII_SPACES):
+        return text
+    return "\n" if "\n" in text else " "
+
+
+def _quote_attribute_value(value: str) -> str:
+    value = _escape_text(value)
+    if '"' in value:
+        if "'" in value:
+            return '"%s"' % value.replace('"', "&quot;")
+        return "'%s'" % value
+    return '"%s"' % value
+
+
+def _get_text(element, preserve_whitespace: bool = False) -> str:
+    # BeautifulSoup의 tag.text처럼 주석과 script/style/template 안의 문자열을 제외한 텍스트
+    # (BeautifulSoup은 파싱할 때 공백으로만 이루어진 문자열을 줄이므로 텍스트도 같은 방식으로 줄임)
+    preserve_whitespace = preserve_whitespace or element.tag in PRESERVE_WHITESPACE_ELEMENTS
+
+    def normalize(text: str) -> str:
+        return text if preserve_whitespace else _collapse_whitespace(text)
+
+    if element.tag in TEXT_EXCLUDED_ELEMENTS:
+        return "".join(normalize(text) for text in element.itertext(etree.Element))
+    text_list: List[str] = []
+    if element.text:
+        text_list.append(normalize(element.text))
+    for child in element:
+        if isinstance(child.tag, str) and child.tag not in TEXT_EXCLUDED_ELEMENTS:
+            text_list.append(_get_text(child, preserve_whitespace))
+        if child.tail:
+            text_list.append(normalize(child.tail))
+    return "".join(text_list)
+
+
+def _is_in_preserve_whitespace_element(element) -> bool:
+    return any(ancestor.tag in PRESERVE_WHITESPACE_ELEMENTS for ancestor in element.iterancestors())
+
+
+class _LxmlNode:
+    # PathQuery가 BeautifulSoup의 노드처럼 다룰 수 있도록 lxml의 노드를 감쌈
+    __slots__ = ("element",)
+
+    def __init__(self, element) -> None:
+        self.element = element
+
+    @property
+    def name(self) -> Optional[str]:
+        # 주석 등은 BeautifulSoup의 문자열처럼 이름이 없음
+        tag = self.element.tag
+        return tag if isinstance(tag, str) else None
+
+    @property
+    def contents(self) -> List["_LxmlNode"]:
+        # 텍스트는 PathQuery가 건너뛰므로 자식 노드만 반환함
+        return [_LxmlNode(child) for child in self.element]
+
+    @property
+    def text(self) -> str:
+        return _get_text(self.element, _is_in_preserve_whitespace_element(self.element))
+
+    def find_all(self, attrs: Dict[str, str]) -> List["_LxmlNode"]:
+        # PathQuery는 id로만 찾음
+        return [_LxmlNode(element) for element in self.element.iterdescendants(etree.Element) if element.get("id") == attrs["id"]]
+
+
+class _LxmlDocument(_LxmlNode):
+    # BeautifulSoup 객체처럼 최상위 노드들을 자식으로 가지는 문서 노드
+    __slots__ = ("top_elements", "containers")
+
+    def __init__(self, root, has_html_tag: bool) -> None:
+        super().__init__(root)
+        if has_html_tag:
+            self.containers = [root]
+            self.top_elements = [root]
+        else:
+            # html.parser는 <html>이 없는 조각을 그대로 두므로, lxml이 만들어 넣은 <head>와 <body>의 자식을 최상위 노드로 봄
+            self.containers = list(root)
+            self.top_elements = [element for container in self.containers for element in container]
+
+    @property
+    def contents(self) -> List[_LxmlNode]:
+        return [_LxmlNode(element) for element in self.top_elements]
+
+    @property
+    def text(self) -> str:
+        # 최상위 노드 사이의 텍스트도 포함함
+        return "".join(_get_text(container) for container in self.containers)
+
+    def find_all(self, attrs: Dict[str, str]) -> List[_LxmlNode]:
+        return [_LxmlNode(element) for top_element in self.top_elements for element in top_element.iter(etree.Element) if element.get("id") == attrs["id"]]
+
+
+class LxmlExtractor:
+    def __init__(self, element_list: Mapping[str, Any]) -> None:
+        # 설정된 element_class/element_id는 XPath로 한 번만 컴파일함
+        # element_path는 XPath와 의미가 다르므로 (//는 두 단계까지만 찾고, html/body는 건너뛰는 등)
+        # BeautifulSoup에서 쓰는 PathQuery를 lxml 노드 위에서 그대로 실행함
+        self.selector_list: List[Union[etree.XPath, PathQuery]] = []
+        for element_spec in element_list:
+            value_list = _to_value_list(element_list[element_spec])
+            if element_spec == "element_path":
+                self.selector_list.extend(HTMLExtractor.compile_path(path_str) for path_str in value_list)
+                continue
+            elif element_spec == "element_class":
+                expr = "//*[%s]" % " or ".join("contains(concat(' ', normalize-space(@class), ' '), %s) or @class = %s" % (_xpath_literal(" %s " % class_str), _xpath_literal(class_str)) for class_str in value_list)
+            elif element_spec == "element_id":
+                expr = "//*[%s]" % " or ".join("@id = %s" % _xpath_literal(id_str) for id_str in value_list)
+            else:
+                raise RuntimeError("unknown configuration '%s'" % element_spec)
+            logger.debug("compiled selector, %s => %s", element_spec, expr)
+            self.selector_list.append(etree.XPath(expr))
+
+    def extract(self, html: str) -> str:
+        if not html.strip():
+            return ""
+        if "\r" in html:
+            # libxml2는 텍스트의 CR을 LF로 바꾸므로, html.parser처럼 CR을 유지하도록 문자 참조로 바꿔둠
+            html = CARRIAGE_RETURN_IN_TEXT_PATTERN.sub(_protect_carriage_return, html)
+        root = lxml.html.document_fromstring(html)
+        document: Optional[_LxmlDocument] = None
+        result_parts: List[str] = []
+        for selector in self.selector_list:
+            if isinstance(selector, PathQuery):
+                if document is None:
+                    document = _LxmlDocument(root, bool(HTML_TAG_PATTERN.search(html)))
+                node_list = [node.element if isinstance(node, _LxmlNode) else node for node in selector.run(document)]
+            else:
+                node_list = selector(root)
+            for node in node_list:
+                if isinstance(node, str):
+                    result_parts.append(str(node))
+                else:
+                    LxmlExtractor.serialize(node, result_parts, _is_in_preserve_whitespace_element(node))
+        return "".join(result_parts)
+
+    @staticmethod
+    def serialize(element, parts: List[str], preserve_whitespace: bool = False) -> None:
+        # BeautifulSoup의 str(tag)와 같은 형식(formatter="minimal")으로 출력함
+        tag = element.tag
+        if not isinstance(tag, str):
+            if isinstance(element, etree._Comment):
+                parts.append("<!--%s-->" % element.text)
+            return
+
+        parts.append("<")
+        parts.append(tag)
+        multi_valued_attributes = MULTI_VALUED_ATTRIBUTES["*"] + MULTI_VALUED_ATTRIBUTES.get(tag, ())
+        # BeautifulSoup(4.8 이상)은 속성을 이름순으로 정렬해서 출력함
+        for name, value in sorted(element.attrib.items()):
+            if name in multi_valued_attributes:
+                value = " ".join(value.split())
+            parts.append(" %s=%s" % (name, _quote_attribute_value(value)))
+
+        if tag in VOID_ELEMENTS:
+            parts.append("/>")
+            return
+        parts.append(">")
+
+        is_cdata_container = tag in CDATA_CONTAINING_ELEMENTS
+        preserve_whitespace = preserve_whitespace or tag in PRESERVE_WHITESPACE_ELEMENTS
+        for text, child in LxmlExtractor._iter_contents(element):
+            if child is not None:
+                LxmlExtractor.serialize(child, parts, preserve_whitespace)
+                continue
+            if not preserve_whitespace:
+                text = _collapse_whitespace(text)
+            parts.append(text if is_cdata_container else _escape_text(text))
+        parts.append("</%s>" % tag)
+
+    @staticmethod
+    def _iter_contents(element):
+        # BeautifulSoup의 tag.contents처럼 텍스트와 자식 노드를 순서대로 반환함
+        if element.text:
+            yield element.text, None
+        for child in element:
+            yield None, child
+            if child.tail:
+                yield child.tail, None
+
+
+_extractor_cache: Dict[str, LxmlExtractor] = {}
+_extractor_cache_lock = threading.Lock()
+
+
+def get_lxml_extractor(element_list: Mapping[str, Any]) -> LxmlExtractor:
+    # 설정이 같으면 컴파일된 셀렉터를 모든 행에서 재사용함
+    key = repr(list(element_list.items()))
+    extractor = _extractor_cache.get(key)
+    if extractor is None:
+        with _extractor_cache_lock:
+            extractor = _extractor_cache.get(key)
+            if extractor is None:
+                extractor = LxmlExtractor(element_list)
+                _extractor_cache[key] = extractor
+    return extractor
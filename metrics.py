@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+
+
+import json
+import time
+import bisect
+import threading
+import logging
+from typing import Dict, List, Tuple, Optional, Any
+
+
+logger = logging.getLogger()
+
+
+# 라벨은 (이름, 값) 쌍을 이름순으로 정렬한 튜플로 저장함
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    # 초 단위 수행 시간에 맞춘 기본 구간 경계
+    DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        # 마지막 칸은 가장 큰 경계보다 큰 값(+Inf)
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def get_cumulative_counts(self) -> List[Tuple[str, int]]:
+        # Prometheus 형식처럼 경계 이하인 값의 누적 개수
+        result: List[Tuple[str, int]] = []
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            result.append(("%g" % bound, total))
+        result.append(("+Inf", total + self.counts[-1]))
+        return result
+
+    def get_quantile(self, q: float) -> Optional[float]:
+        # 구간 안에서는 선형 보간한 근사값
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        total = 0
+        lower = 0.0
+        for i, count in enumerate(self.counts):
+            upper = self.buckets[i] if i < len(self.buckets) else self.max
+            if count and total + count >= rank:
+                value = lower + (upper - lower) * (rank - total) / count
+                return min(max(value, self.min), self.max)
+            total += count
+            lower = upper
+        return self.max
+
+
+class _NullTimer:
+    # 측정을 끈 상태에서 timer()가 반환하는 아무 일도 하지 않는 객체
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    def __init__(self, metrics: "Metrics", name: str, labels: Dict[str, Any]) -> None:
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+        self.started_at = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.metrics.observe(self.name, time.perf_counter() - self.started_at, **self.labels)
+
+
+class Metrics:
+    # 내보낼 때 모든 측정값 이름 앞에 붙이는 접두사
+    PREFIX = "excel_crawling_"
+
+    def __init__(self) -> None:
+        # 꺼져 있으면 호출하는 쪽에서 enabled만 확인하고 아무것도 기록하지 않음
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    @staticmethod
+    def _make_key(name: str, labels: Dict[str, Any]) -> Tuple[str, Labels]:
+        return name, tuple(sorted((label_name, str(value)) for label_name, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        if not self.enabled:
+            return
+        key = Metrics._make_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        if not self.enabled:
+            return
+        key = Metrics._make_key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = Histogram()
+                self._histograms[key] = histogram
+            histogram.observe(value)
+
+    def timer(self, name: str, **labels: Any):
+        # with metrics.timer("stage_seconds", stage="write"): ... 형태로 수행 시간을 기록함
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    @staticmethod
+    def _format_labels(labels: Labels) -> str:
+        return ",".join("%s=%s" % (name, value) for name, value in labels)
+
+    def get_summary(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                p50 = histogram.get_quantile(0.5) or 0.0
+                p95 = histogram.get_quantile(0.95) or 0.0
+                lines.append("%-24s %-40s count=%d total=%.3fs mean=%.1fms p50=%.1fms p95=%.1fms max=%.1fms" % (name, Metrics._format_labels(labels), histogram.count, histogram.sum, histogram.sum / histogram.count * 1000, p50 * 1000, p95 * 1000, (histogram.max or 0.0) * 1000))
+            for (name, labels), value in sorted(self._counters.items()):
+                lines.append("%-24s %-40s %g" % (name, Metrics._format_labels(labels), value))
+        return "\n".join(lines)
+
+    @staticmethod
+    def _format_prometheus_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        label_list = labels + extra
+        if not label_list:
+            return ""
+        return "{%s}" % ",".join('%s="%s"' % (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for name, value in label_list)
+
+    def to_prometheus(self) -> str:
+        # Prometheus 텍스트 형식(text/plain; version=0.0.4)
+        lines: List[str] = []
+        with self._lock:
+            type_written = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                metric_name = Metrics.PREFIX + name
+                if metric_name not in type_written:
+                    lines.append("# TYPE %s counter" % metric_name)
+                    type_written.add(metric_name)
+                lines.append("%s%s %s" % (metric_name, Metrics._format_prometheus_labels(labels), repr(float(value))))
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                metric_name = Metrics.PREFIX + name
+                if metric_name not in type_written:
+                    lines.append("# TYPE %s histogram" % metric_name)
+                    type_written.add(metric_name)
+                for bound, count in histogram.get_cumulative_counts():
+                    lines.append("%s_bucket%s %d" % (metric_name, Metrics._format_prometheus_labels(labels, (("le", bound),)), count))
+                lines.append("%s_sum%s %s" % (metric_name, Metrics._format_prometheus_labels(labels), repr(histogram.sum)))
+                lines.append("%s_count%s %d" % (metric_name, Metrics._format_prometheus_labels(labels), histogram.count))
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in sorted(self._counters.items())],
+                "histograms": [{"name": name, "labels": dict(labels), "count": histogram.count, "sum": histogram.sum, "min": histogram.min, "max": histogram.max, "p50": histogram.get_quantile(0.5), "p95": histogram.get_quantile(0.95), "buckets": dict(histogram.get_cumulative_counts())} for (name, labels), histogram in sorted(self._histograms.items())],
+            }
+
+    def export(self, file_path: str) -> None:
+        # 확장자가 .json이면 JSON으로, 그 외에는 Prometheus 텍스트 형식으로 저장함
+        with open(file_path, "w") as f:
+            if file_path.endswith(".json"):
+                json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+                f.write("\n")
+            else:
+                f.write(self.to_prometheus())
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    # 프로세스 전체에서 하나의 Metrics를 공유함
+    return _metrics
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+
+import time
+import threading
+import logging
+from urllib.parse import urlsplit
+from typing import Dict, Optional
+
+
+logger = logging.getLogger()
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float) -> None:
+        # rate: 초당 채워지는 토큰 수, burst: 최대로 쌓을 수 있는 토큰 수
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self) -> float:
+        # 토큰 하나를 예약하고 기다려야 하는 시간(초)을 반환
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            wait = 0.0
+            if self.tokens < 0:
+                wait = -self.tokens / self.rate
+            return max(wait, self.paused_until - now)
+
+    def acquire(self) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def set_rate(self, rate: float) -> None:
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+
+    def pause(self, seconds: float) -> None:
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class HostRateLimiter:
+    # 요청 속도를 줄여야 하는 응답 상태 코드
+    THROTTLE_STATUS_CODES = (429, 503)
+
+    def __init__(self, rate: float = 2.0, burst: float = 2.0, min_rate: float = 0.1, max_rate: Optional[float] = None, decrease_factor: float = 0.5, increase_step: float = 0.05) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate if max_rate else rate
+        self.decrease_factor = decrease_factor
+        self.increase_step = increase_step
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_host(url: str) -> str:
+        return urlsplit(url).netloc
+
+    def get_bucket(self, url: str) -> TokenBucket:
+        host = HostRateLimiter.get_host(url)
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(host)
+                if bucket is None:
+                    bucket = TokenBucket(self.rate, self.burst)
+                    self._buckets[host] = bucket
+        return bucket
+
+    def acquire(self, url: str) -> float:
+        return self.get_bucket(url).acquire()
+
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        # Retry-After는 초 단위 숫자 또는 HTTP 날짜 형식
+        if not value:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        # 날짜 형식은 드물게 오므로 email 패키지는 이때 읽어들임
+        from email.utils import parsedate_to_datetime
+
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def update(self, url: str, status_code: int, retry_after: Optional[str] = None) -> None:
+        # 429/503 응답을 받으면 속도를 곱셈으로 줄이고, 성공하면 조금씩 늘림(AIMD)
+        bucket = self.get_bucket(url)
+        if status_code in HostRateLimiter.THROTTLE_STATUS_CODES:
+            new_rate = max(self.min_rate, bucket.rate * self.decrease_factor)
+            bucket.set_rate(new_rate)
+            delay = HostRateLimiter.parse_retry_after(retry_after)
+            if delay:
+                bucket.pause(delay)
+            logger.warning("throttled by '%s' (status=%d), rate=%.2f/s, retry_after=%s", HostRateLimiter.get_host(url), status_code, new_rate, delay)
+        elif status_code < 400 and bucket.rate < self.max_rate:
+            bucket.set_rate(min(self.max_rate, bucket.rate + self.increase_step))
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+
+
+import time
+import sqlite3
+import threading
+import logging
+from typing import Optional
+
+
+logger = logging.getLogger()
+
+
+class ResultStore:
+    # 정규화된 ISBN => 추출된 설명을 여러 프로세스가 동시에 읽고 쓸 수 있도록 SQLite(WAL)에 저장함
+    def __init__(self, store_file: str, fingerprint: str, ttl: float = 0) -> None:
+        # fingerprint가 다른 항목(설정이 바뀌기 전에 추출된 결과)은 쓰지 않고, ttl이 0이면 만료되지 않음
+        self.store_file = store_file
+        self.fingerprint = fingerprint
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(store_file, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                isbn TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                description TEXT NOT NULL,
+                stored_at REAL NOT NULL
+            )""")
+        num_stale = self._conn.execute("SELECT COUNT(*) FROM results WHERE fingerprint != ?", (fingerprint,)).fetchone()[0]
+        if num_stale:
+            logger.info("%d results in '%s' were extracted with a different configuration and will be crawled again", num_stale, store_file)
+
+    def __enter__(self) -> "ResultStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get(self, isbn: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT description, stored_at FROM results WHERE isbn = ? AND fingerprint = ?", (isbn, self.fingerprint)).fetchone()
+        if not row:
+            return None
+        description, stored_at = row
+        if self.ttl > 0 and time.time() - stored_at >= self.ttl:
+            return None
+        return description
+
+    def put(self, isbn: str, description: str) -> None:
+        # 다른 설정으로 저장된 항목은 새 결과로 덮어씀
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO results (isbn, fingerprint, description, stored_at) VALUES (?, ?, ?, ?)",
+                               (isbn, self.fingerprint, description, time.time()))
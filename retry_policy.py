@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+
+
+import time
+import random
+import threading
+import logging
+from urllib.parse import urlsplit
+from typing import Dict, Tuple, Type, Optional
+
+
+logger = logging.getLogger()
+
+
+class RetryPolicy:
+    DEFAULT_RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+    DEFAULT_RETRYABLE_EXCEPTIONS = "ConnectionError,Timeout,ChunkedEncodingError"
+
+    def __init__(self, max_attempts: int = 3, backoff_base: float = 0.5, backoff_max: float = 30.0, retryable_status_codes: Tuple[int, ...] = DEFAULT_RETRYABLE_STATUS_CODES, retryable_exceptions: Optional[Tuple[Type[BaseException], ...]] = None) -> None:
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retryable_status_codes = retryable_status_codes
+        if retryable_exceptions is None:
+            retryable_exceptions = RetryPolicy.get_exception_classes(RetryPolicy.DEFAULT_RETRYABLE_EXCEPTIONS)
+        self.retryable_exceptions = retryable_exceptions
+
+    @staticmethod
+    def get_exception_classes(names: str) -> Tuple[Type[BaseException], ...]:
+        # "ConnectionError,Timeout"처럼 설정된 이름을 requests.exceptions의 예외 클래스로 변환
+        import requests
+
+        exception_list = []
+        for name in names.split(","):
+            name = name.strip()
+            if not name:
+                continue
+            exception_class = getattr(requests.exceptions, name, None)
+            if not isinstance(exception_class, type) or not issubclass(exception_class, BaseException):
+                raise ValueError("unknown exception '%s'" % name)
+            exception_list.append(exception_class)
+        return tuple(exception_list)
+
+    def is_retryable_status(self, status_code: int) -> bool:
+        return status_code in self.retryable_status_codes
+
+    def is_retryable_exception(self, e: BaseException) -> bool:
+        return isinstance(e, self.retryable_exceptions)
+
+    def get_delay(self, attempt: int) -> float:
+        # 지수 백오프에 full jitter를 적용한 대기 시간 (attempt는 1부터 시작)
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return random.uniform(0, delay)
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        # host별로 연속 실패가 failure_threshold번 이상이면 reset_timeout 동안 요청을 바로 실패시킴
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failure_counts: Dict[str, int] = {}
+        self._opened_at: Dict[str, float] = {}
+        self._half_open_hosts: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_host(url: str) -> str:
+        return urlsplit(url).netloc
+
+    def get_state(self, url: str) -> str:
+        host = CircuitBreaker.get_host(url)
+        with self._lock:
+            return self._get_state(host, time.monotonic())
+
+    def _get_state(self, host: str, now: float) -> str:
+        if host not in self._opened_at:
+            return CircuitBreaker.CLOSED
+        if now - self._opened_at[host] >= self.reset_timeout:
+            return CircuitBreaker.HALF_OPEN
+        return CircuitBreaker.OPEN
+
+    def allow_request(self, url: str) -> bool:
+        # half-open 상태에서는 한 번의 시험 요청만 허용함
+        host = CircuitBreaker.get_host(url)
+        with self._lock:
+            state = self._get_state(host, time.monotonic())
+            if state == CircuitBreaker.CLOSED:
+                return True
+            if state == CircuitBreaker.HALF_OPEN and not self._half_open_hosts.get(host):
+                self._half_open_hosts[host] = True
+                return True
+            return False
+
+    def record_success(self, url: str) -> None:
+        host = CircuitBreaker.get_host(url)
+        with self._lock:
+            self._failure_counts.pop(host, None)
+            self._half_open_hosts.pop(host, None)
+            if self._opened_at.pop(host, None) is not None:
+                logger.info("circuit closed for '%s'", host)
+
+    def release_trial(self, url: str) -> None:
+        # 시험 요청이 성공도 실패도 아닌 채로 끝나면, 다음 요청이 다시 시험 요청이 될 수 있게 함
+        host = CircuitBreaker.get_host(url)
+        with self._lock:
+            self._half_open_hosts.pop(host, None)
+
+    def record_failure(self, url: str) -> None:
+        host = CircuitBreaker.get_host(url)
+        with self._lock:
+            count = self._failure_counts.get(host, 0) + 1
+            self._failure_counts[host] = count
+            was_half_open = self._half_open_hosts.pop(host, False)
+            if was_half_open or count >= self.failure_threshold:
+                if host not in self._opened_at or was_half_open:
+                    logger.warning("circuit opened for '%s' after %d failures", host, count)
+                self._opened_at[host] = time.monotonic()
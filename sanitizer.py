@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+
+
+import re
+import threading
+import logging
+from typing import Dict, List, Tuple, Sequence, Callable, Union, Match
+
+
+logger = logging.getLogger()
+
+
+# 치환 문자열(\1, \g<name> 사용 가능) 또는 매칭 결과를 받아 치환할 문자열을 반환하는 함수
+Replacement = Union[str, Callable[[Match], str]]
+
+
+def _join_alt_lines(m: Match) -> str:
+    # 줄에서 첫번째 alt=" 이후의, 뒤에 "가 있는 마지막 <br>을 공백으로 바꾸고 마지막 " 뒤는 그대로 둠
+    # (alt="(.*)<br>(.*)"와 같은 결과로, 정규식 대신 rfind()로 나누어 <br>이 많고 "가 없는 줄에서도 역추적하지 않음)
+    # 한 줄에서 첫번째 alt="가 매칭되지 않으면 뒤의 alt="도 매칭될 수 없으므로 줄의 나머지를 그대로 돌려줌
+    line = m.group(0)
+    quote_index = line.rfind('"')
+    br_index = line.rfind("<br>", 5, quote_index) if quote_index >= 5 else -1
+    if br_index < 0:
+        return line
+    return 'alt="%s %s"%s' % (line[5:br_index], line[br_index + 4:quote_index], line[quote_index + 1:])
+
+
+# 파서에 넘기기 전에 HTML에 차례로 적용하는 기본 (패턴, 치환) 규칙
+DEFAULT_RULES: Tuple[Tuple[str, Replacement], ...] = (
+    (r'alt="[^\n]*', _join_alt_lines),
+    (r'<br>', r'<br/>'),
+    (r'<\?xml[^>]+>', r''),
+)
+# 규칙을 적용하기 전에 지우는 제어 문자
+DEFAULT_DELETE_CHARS = "\x01\x08"
+
+# 설정 파일에는 제어 문자를 직접 쓸 수 없으므로 \xNN, \uNNNN 형태로 씀
+_CHAR_ESCAPE_PATTERN = re.compile(r'\\x([0-9a-fA-F]{2})|\\u([0-9a-fA-F]{4})')
+
+
+def unescape_chars(escaped: str) -> str:
+    return _CHAR_ESCAPE_PATTERN.sub(lambda m: chr(int(m.group(1) or m.group(2), 16)), escaped)
+
+
+def get_replacement_name(replacement: Replacement) -> str:
+    # 설정의 해시를 만들 때 쓰는, 프로세스가 달라도 변하지 않는 치환의 이름
+    if isinstance(replacement, str):
+        return replacement
+    return "%s.%s" % (replacement.__module__, replacement.__qualname__)
+
+
+class Sanitizer:
+    def __init__(self, rules: Sequence[Tuple[str, Replacement]] = DEFAULT_RULES, delete_chars: str = DEFAULT_DELETE_CHARS) -> None:
+        # 규칙은 한 번만 컴파일하고, 앞의 규칙이 치환한 결과에 뒤의 규칙을 적용함
+        self.rules: List[Tuple["re.Pattern[str]", Replacement]] = [(re.compile(pattern), replacement) for pattern, replacement in rules]
+        self.delete_chars = delete_chars
+        self._delete_pattern = re.compile("[%s]" % re.escape(delete_chars)) if delete_chars else None
+
+    def sanitize(self, html: str) -> str:
+        # 지울 문자가 없는 대부분의 페이지는 문자열 검색만 하고 지나감
+        if self._delete_pattern and any(c in html for c in self.delete_chars):
+            html = self._delete_pattern.sub("", html)
+        for pattern, replacement in self.rules:
+            html = pattern.sub(replacement, html)
+        return html
+
+
+_sanitizer_cache: Dict[Tuple[Tuple[Tuple[str, Replacement], ...], str], Sanitizer] = {}
+_sanitizer_cache_lock = threading.Lock()
+
+
+def get_sanitizer(rules: Sequence[Tuple[str, Replacement]] = DEFAULT_RULES, delete_chars: str = DEFAULT_DELETE_CHARS) -> Sanitizer:
+    # 설정이 같으면 컴파일된 규칙을 모든 페이지에서 재사용함
+    key = (tuple(rules), delete_chars)
+    sanitizer = _sanitizer_cache.get(key)
+    if sanitizer is None:
+        with _sanitizer_cache_lock:
+            sanitizer = _sanitizer_cache.get(key)
+            if sanitizer is None:
+                sanitizer = Sanitizer(rules, delete_chars)
+                _sanitizer_cache[key] = sanitizer
+    return sanitizer
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+
+import re
+import logging
+from typing import List, Iterable, Iterator, Optional
+
+
+logger = logging.getLogger()
+
+
+class SearchResultExtractor:
+    # 검색 결과 목록의 시작 부분과 결과 항목의 링크
+    DEFAULT_LIST_PATTERN = r'<ul class="basic" id="searchBiblioList"'
+    DEFAULT_LINK_PATTERN = r'<a href="(?P<url>http://book.naver.com/[^"]+)"'
+
+    def __init__(self, list_pattern: Optional[str] = None, link_pattern: Optional[str] = None) -> None:
+        self.list_pattern = re.compile(list_pattern or SearchResultExtractor.DEFAULT_LIST_PATTERN)
+        self.link_pattern = re.compile(link_pattern or SearchResultExtractor.DEFAULT_LINK_PATTERN)
+        if "url" not in self.link_pattern.groupindex:
+            raise ValueError("link pattern must have a named group 'url', '%s'" % self.link_pattern.pattern)
+
+    def iter_links(self, html: str) -> Iterator[str]:
+        # 목록 시작 부분을 찾고, 그 다음 줄부터 링크를 순서대로 찾음
+        m = self.list_pattern.search(html)
+        if not m:
+            return
+        pos = html.find("\n", m.end())
+        if pos < 0:
+            return
+        for m in self.link_pattern.finditer(html, pos + 1):
+            yield m.group("url")
+
+    def extract_links(self, html: str, max_links: Optional[int] = None) -> List[str]:
+        link_list: List[str] = []
+        for url in self.iter_links(html):
+            link_list.append(url)
+            if max_links and len(link_list) >= max_links:
+                break
+        return link_list
+
+    def extract_first_link(self, html: str) -> Optional[str]:
+        # 첫번째 링크를 찾으면 바로 탐색을 중단함
+        for url in self.iter_links(html):
+            return url
+        return None
+
+    def extract_first_link_from_chunks(self, chunks: Iterable[str]) -> Optional[str]:
+        # 응답을 조각 단위로 받으면서 찾고, 첫번째 링크를 찾으면 나머지 조각은 읽지 않음
+        # 조각의 경계에 걸친 패턴을 놓치지 않도록 끝까지 받은 줄에서만 찾으며,
+        # 목록 시작 부분과 링크가 각각 한 줄 안에 있다고 가정함 (예전의 줄 단위 탐색과 같음)
+        buffer = ""
+        in_list = False
+        chunk_iter = iter(chunks)
+        is_last = False
+        while not is_last:
+            chunk = next(chunk_iter, None)
+            if chunk is None:
+                # 마지막 조각까지 받았으면 끝나지 않은 마지막 줄까지 찾음
+                is_last = True
+                end = len(buffer)
+            else:
+                buffer += chunk
+                end = buffer.rfind("\n") + 1
+                if end == 0:
+                    continue
+            if not in_list:
+                m = self.list_pattern.search(buffer, 0, end)
+                if not m:
+                    buffer = buffer[end:]
+                    continue
+                pos = buffer.find("\n", m.end())
+                if pos < 0:
+                    # 목록 시작 부분이 있는 줄을 다 받을 때까지 기다림
+                    buffer = buffer[m.start():]
+                    continue
+                in_list = True
+                buffer = buffer[pos + 1:]
+                end = max(0, end - (pos + 1))
+            m = self.link_pattern.search(buffer, 0, end)
+            if m:
+                return m.group("url")
+            buffer = buffer[end:]
+        return None
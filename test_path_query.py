@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+
+import os
+import glob
+import random
+import unittest
+from unittest import mock
+from typing import List
+from bs4 import BeautifulSoup
+
+from util import IO, HTMLExtractor
+
+
+FIXTURE_DIR = os.path.dirname(os.path.abspath(__file__))
+NAMES = ["div", "p", "span", "ul", "li"]
+IDS = ["a", "b", "c"]
+
+
+def make_random_document(rng: random.Random, depth: int = 0) -> str:
+    # 같은 id가 여러 번 나오거나 아예 없는 경우도 만들어지도록 id를 적은 수에서 고름
+    html = ""
+    for _ in range(rng.randint(1 if depth == 0 else 0, 3 if depth < 4 else 0)):
+        r = rng.random()
+        if r < 0.7:
+            name = rng.choice(NAMES)
+            attrs = ' id="%s"' % rng.choice(IDS) if rng.random() < 0.2 else ""
+            html += "<%s%s>%s</%s>" % (name, attrs, make_random_document(rng, depth + 1), name)
+        elif r < 0.9:
+            html += rng.choice(["text", " ", "\n"])
+        else:
+            html += "<!--comment-->"
+    return html
+
+
+def make_random_path(rng: random.Random) -> str:
+    step_list: List[str] = []
+    for _ in range(rng.randint(1, 4)):
+        r = rng.random()
+        if r < 0.15:
+            step_list.append('*[@id="%s"]' % rng.choice(IDS))
+        elif r < 0.45:
+            step_list.append("%s[%d]" % (rng.choice(NAMES), rng.randint(0, 3)))
+        else:
+            step_list.append(rng.choice(NAMES))
+    if rng.random() < 0.2:
+        step_list.append("text()")
+    return rng.choice(["", "/", "//", "/html/body/", "html/body/"]) + "/".join(step_list)
+
+
+def get_node_with_path_without_unpack_error(soup, path_str: str) -> List:
+    # 예전 함수는 마지막 단계가 *[@id=...]이면 빈 경로의 토큰(5개 값)을 6개로 풀다가 ValueError로 실패함
+    # PathQuery는 이 경우 id로 찾은 노드를 반환하므로, 그 부분만 고친 예전 함수와 비교함
+    get_first_token_from_path = HTMLExtractor.get_first_token_from_path
+
+    def get_first_token(path_str: str):
+        token = get_first_token_from_path(path_str)
+        return token if len(token) == 6 else token[:4] + ("", False)
+
+    with mock.patch.object(HTMLExtractor, "get_first_token_from_path", staticmethod(get_first_token)):
+        return HTMLExtractor.get_node_with_path(soup, path_str) or []
+
+
+class PathQueryTest(unittest.TestCase):
+    # 컴파일된 PathQuery가 재귀 함수 get_node_with_path()와 같은 노드를 같은 순서로 반환하는지 확인함
+    def assert_same_nodes(self, soup, path_str: str) -> None:
+        actual = HTMLExtractor.compile_path(path_str).run(soup)
+        try:
+            expected = HTMLExtractor.get_node_with_path(soup, path_str) or []
+        except ValueError:
+            self.assertTrue(HTMLExtractor.compile_path(path_str).steps[-1].node_id, path_str)
+            expected = get_node_with_path_without_unpack_error(soup, path_str)
+        self.assertEqual(len(actual), len(expected), path_str)
+        for actual_node, expected_node in zip(actual, expected):
+            # 같은 노드 객체이거나, text()의 결과인 같은 문자열이어야 함
+            if isinstance(expected_node, str):
+                self.assertEqual(actual_node, expected_node, path_str)
+            else:
+                self.assertIs(actual_node, expected_node, path_str)
+
+    def test_fixtures(self) -> None:
+        path_list = [
+            '*[@id="tableOfContentsContent"]',
+            '*[@id="tableOfContentsContent"]/p',
+            '*[@id="tableOfContentsContent"]/p/text()',
+            '*[@id="bookIntroContent"]/p[1]',
+            '*[@id="container"]/div[2]/div',
+            '*[@id="no_such_id"]/div',
+            "div/div[2]",
+            "//div",
+            "//div/p",
+            "/html/body/div/div[3]",
+            "text()",
+        ]
+        file_list = sorted(glob.glob(os.path.join(FIXTURE_DIR, "test.*.html")))
+        self.assertTrue(file_list)
+        for file in file_list:
+            soup = BeautifulSoup(IO.read_file(file), "html.parser")
+            for path_str in path_list:
+                with self.subTest(file=os.path.basename(file), path=path_str):
+                    self.assert_same_nodes(soup, path_str)
+
+    def test_deep_document(self) -> None:
+        # 재귀 함수의 호출 깊이보다 깊은 경로도 같은 결과를 반환함
+        depth = 60
+        html = "".join("<div>" for _ in range(depth)) + "<p>leaf</p>" + "".join("</div>" for _ in range(depth))
+        soup = BeautifulSoup(html, "html.parser")
+        path_str = "/".join(["div"] * depth) + "/p"
+        self.assertEqual([str(node) for node in HTMLExtractor.compile_path(path_str).run(soup)], ["<p>leaf</p>"])
+        self.assert_same_nodes(soup, path_str)
+
+    def test_generated_cases(self) -> None:
+        rng = random.Random(20200101)
+        for _ in range(300):
+            html = make_random_document(rng)
+            soup = BeautifulSoup(html, "html.parser")
+            for _ in range(10):
+                path_str = make_random_path(rng)
+                with self.subTest(html=html, path=path_str):
+                    self.assert_same_nodes(soup, path_str)
+
+    def test_trailing_id_step(self) -> None:
+        soup = BeautifulSoup('<div><p id="a">x</p></div>', "html.parser")
+        with self.assertRaises(ValueError):
+            HTMLExtractor.get_node_with_path(soup, '*[@id="a"]')
+        self.assertEqual([str(node) for node in HTMLExtractor.compile_path('*[@id="a"]').run(soup)], ['<p id="a">x</p>'])
+
+    def test_invalid_path(self) -> None:
+        for path_str in ("", "/", "div/[1]"):
+            with self.subTest(path=path_str):
+                with self.assertRaises(ValueError):
+                    HTMLExtractor.compile_path(path_str)
+
+
+if __name__ == "__main__":
+    unittest.main()
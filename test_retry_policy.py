@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+
+
+import time
+import unittest
+from typing import Tuple, Optional
+
+import requests
+
+from crawler import Crawler, Method, CrawlingError, CircuitOpenError
+from retry_policy import RetryPolicy, CircuitBreaker
+
+
+URL = "http://book.example.com/search?q=1"
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        self.crawler = Crawler(Method.GET, {}, 1, retry_policy=RetryPolicy(max_attempts=1), circuit_breaker=self.circuit_breaker)
+
+    def open_and_wait(self) -> None:
+        def fetch(url: str) -> Tuple[int, Optional[str]]:
+            raise requests.ConnectionError("connection refused")
+
+        with self.assertRaises(CrawlingError):
+            self.crawler.run_with_retry(URL, fetch)
+        self.assertEqual(self.circuit_breaker.get_state(URL), CircuitBreaker.OPEN)
+        time.sleep(0.06)
+        self.assertEqual(self.circuit_breaker.get_state(URL), CircuitBreaker.HALF_OPEN)
+
+    def assert_next_request_allowed(self) -> None:
+        self.assertEqual(self.crawler.run_with_retry(URL, lambda url: (200, "page")), "page")
+        self.assertEqual(self.circuit_breaker.get_state(URL), CircuitBreaker.CLOSED)
+
+    def test_retryable_failure_opens(self) -> None:
+        self.open_and_wait()
+        with self.assertRaises(CrawlingError):
+            self.crawler.run_with_retry(URL, lambda url: (503, None))
+        # 시험 요청이 실패하면 다시 열림
+        self.assertEqual(self.circuit_breaker.get_state(URL), CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.crawler.run_with_retry(URL, lambda url: (200, "page"))
+
+    def test_non_retryable_exception_ends_trial(self) -> None:
+        # 재시도하지 않는 예외로 끝난 시험 요청 때문에 계속 열린 채로 남지 않음
+        self.open_and_wait()
+
+        def fetch(url: str) -> Tuple[int, Optional[str]]:
+            raise requests.TooManyRedirects("exceeded 30 redirects")
+
+        with self.assertRaises(CrawlingError) as cm:
+            self.crawler.run_with_retry(URL, fetch)
+        self.assertNotIsInstance(cm.exception, CircuitOpenError)
+        self.assert_next_request_allowed()
+
+    def test_other_exception_ends_trial(self) -> None:
+        # consume() 등에서 발생한 requests 이외의 예외도 시험 요청을 끝냄
+        self.open_and_wait()
+
+        def fetch(url: str) -> Tuple[int, Optional[str]]:
+            raise RuntimeError("parser failed")
+
+        with self.assertRaises(RuntimeError):
+            self.crawler.run_with_retry(URL, fetch)
+        self.assertEqual(self.circuit_breaker.get_state(URL), CircuitBreaker.HALF_OPEN)
+        self.assert_next_request_allowed()
+
+    def test_one_trial_at_a_time(self) -> None:
+        self.open_and_wait()
+        self.assertTrue(self.circuit_breaker.allow_request(URL))
+        self.assertFalse(self.circuit_breaker.allow_request(URL))
+        self.circuit_breaker.release_trial(URL)
+        self.assertTrue(self.circuit_breaker.allow_request(URL))
+
+
+if __name__ == "__main__":
+    unittest.main()
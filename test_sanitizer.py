@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+
+
+import os
+import re
+import glob
+import time
+import random
+import unittest
+
+from util import IO
+from sanitizer import Sanitizer, DEFAULT_RULES, get_sanitizer, get_replacement_name, unescape_chars, _join_alt_lines
+from benchmark import legacy_sanitize
+
+
+FIXTURE_DIR = os.path.dirname(os.path.abspath(__file__))
+# 규칙에 걸리는 조각들로 만든 문자열
+PIECES = ['alt="', '<br>', '"', "x", " ", "\n", '<?xml version="1.0"?>', "<?xml>", "<", ">", "<br/>", "alt=", "\x01", "\x08"]
+
+
+def make_random_html(rng: random.Random) -> str:
+    return "".join(rng.choice(PIECES) for _ in range(rng.randint(0, 30)))
+
+
+def legacy_sanitize_without_control_chars(html: str) -> str:
+    # Sanitizer는 규칙을 적용하기 전에 제어 문자를 지우므로, 제어 문자를 먼저 지운 입력에 예전 정리 단계를 적용해서 비교함
+    # (예전 정리 단계는 <br> 치환 뒤에 지우고, re.LOCALE이 count 자리에 들어가서 앞의 4개만 지웠음)
+    return legacy_sanitize(re.sub(r"[\x01\x08]", "", html))
+
+
+class SanitizerTest(unittest.TestCase):
+    def test_fixtures(self) -> None:
+        sanitizer = Sanitizer()
+        file_list = sorted(glob.glob(os.path.join(FIXTURE_DIR, "test.*.html")))
+        self.assertTrue(file_list)
+        html_list = [IO.read_file(file) for file in file_list]
+        for name, html in list(zip(file_list, html_list)) + [("large page", "\n".join(html_list))]:
+            with self.subTest(name=os.path.basename(name)):
+                self.assertEqual(sanitizer.sanitize(html), legacy_sanitize(html))
+
+    def test_generated_cases(self) -> None:
+        sanitizer = Sanitizer()
+        rng = random.Random(20200101)
+        for _ in range(5000):
+            html = make_random_html(rng)
+            with self.subTest(html=html):
+                self.assertEqual(sanitizer.sanitize(html), legacy_sanitize_without_control_chars(html))
+                if "\x01" not in html and "\x08" not in html:
+                    self.assertEqual(sanitizer.sanitize(html), legacy_sanitize(html))
+
+    def test_alt_lines(self) -> None:
+        # 줄에서 첫번째 alt=" 이후의 마지막 <br>만 공백으로 바뀌고, 나머지 <br>은 <br/>로 바뀜
+        sanitizer = Sanitizer()
+        self.assertEqual(sanitizer.sanitize('<img alt="a<br>b<br>c">'), '<img alt="a<br/>b c">')
+        self.assertEqual(sanitizer.sanitize('<img alt="a">\n<br>"'), '<img alt="a">\n<br/>"')
+
+    def test_long_line(self) -> None:
+        # 예전 패턴은 <br>이 없는 긴 줄에서 alt="마다 줄 끝까지 역추적해서 줄 길이의 제곱에 비례하는 시간이 걸림
+        html = '<img alt="cover" src="cover.jpg">' * 20000 + "\n"
+        started_at = time.perf_counter()
+        self.assertEqual(Sanitizer().sanitize(html), html)
+        self.assertLess(time.perf_counter() - started_at, 1.0)
+
+    def test_long_br_line(self) -> None:
+        # 예전 패턴은 <br>이 많고 alt=" 뒤에 "가 없는 줄에서도 <br>마다 줄 끝까지 역추적함
+        html = '<img alt="' + "x<br>" * 80000 + "\n"
+        started_at = time.perf_counter()
+        self.assertEqual(Sanitizer().sanitize(html), '<img alt="' + "x<br/>" * 80000 + "\n")
+        self.assertLess(time.perf_counter() - started_at, 1.0)
+        html = '<img alt="' + "x<br>" * 1000 + '"' + "x<br>" * 1000
+        self.assertEqual(Sanitizer().sanitize(html), legacy_sanitize(html))
+
+    def test_delete_all_control_chars(self) -> None:
+        # 예전 정리 단계와 달리 제어 문자는 개수와 관계없이 모두 지움
+        self.assertEqual(Sanitizer().sanitize("a\x01b\x08" * 10), "ab" * 10)
+        self.assertEqual(Sanitizer(delete_chars="").sanitize("a\x01b"), "a\x01b")
+
+    def test_delete_control_chars_before_rules(self) -> None:
+        # 제어 문자가 규칙의 패턴 사이에 끼어 있어도 규칙이 적용됨
+        sanitizer = Sanitizer()
+        self.assertEqual(sanitizer.sanitize('alt=\x08"a<br>b"'), 'alt="a b"')
+        self.assertEqual(sanitizer.sanitize("<?xml\x01>x"), "<?xml>x")
+
+    def test_configured_rules(self) -> None:
+        sanitizer = Sanitizer([(r"<(/?)b>", r"<\1strong>"), (r"\s+", " ")], "\x02")
+        self.assertEqual(sanitizer.sanitize("<b>x</b>\n\n\x02y"), "<strong>x</strong> y")
+
+    def test_get_sanitizer(self) -> None:
+        # 같은 설정이면 컴파일된 규칙을 재사용함
+        self.assertIs(get_sanitizer(), get_sanitizer(DEFAULT_RULES))
+        self.assertIsNot(get_sanitizer(), get_sanitizer(delete_chars="\x01"))
+
+    def test_unescape_chars(self) -> None:
+        self.assertEqual(unescape_chars(r"\x01\x08"), "\x01\x08")
+        self.assertEqual(unescape_chars(r"a b"), "a b")
+
+    def test_replacement_name(self) -> None:
+        self.assertEqual(get_replacement_name(r"<br/>"), r"<br/>")
+        self.assertEqual(get_replacement_name(_join_alt_lines), "sanitizer._join_alt_lines")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,18 +4,32 @@
 import os
 import sys
 import re
-import subprocess
+import json
+import time
+import codecs
+import hashlib
+import functools
+import threading
 import logging
-import logging.config
-import xmltodict
 from datetime import datetime
-from typing import List, Any, Dict, Tuple, Optional, Set
-from ordered_set import OrderedSet
-from pprint import pprint
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import List, Any, Dict, Tuple, Optional, Set, Mapping
+from sanitizer import DEFAULT_RULES as DEFAULT_SANITIZE_RULES, DEFAULT_DELETE_CHARS, Replacement, unescape_chars, get_replacement_name
 
 
-logging.config.fileConfig("logging.conf")
 logger = logging.getLogger()
+_logging_initialized = False
+
+
+def init_logging(config_file: str = "logging.conf") -> None:
+    # 진입점에서 한 번만 호출하며, fork로 만들어진 추출용 프로세스처럼 이미 설정된 프로세스에서는 아무것도 하지 않음
+    global _logging_initialized
+    if _logging_initialized:
+        return
+    import logging.config
+    logging.config.fileConfig(config_file)
+    _logging_initialized = True
 
 
 def make_path(path: str) -> None:
@@ -27,6 +41,8 @@ def make_path(path: str) -> None:
 
 
 def exec_cmd(cmd: str, input_data=None) -> Tuple[Optional[str], str]:
+    import subprocess
+
     try:
         p = subprocess.Popen(cmd, shell=True, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
         if input_data:
@@ -77,7 +93,7 @@ def determine_crawler_options(options: Dict[str, Any]) -> str:
 
 
 def remove_duplicates(a_list: List[Any]) -> List[Any]:
-    seen: Set[Any] = OrderedSet()
+    seen: Set[Any] = set()
     result: List[Any] = []
     for item in a_list:
         if item not in seen:
@@ -112,7 +128,137 @@ def get_short_date_str(dt=get_current_time()) -> str:
     return dt.strftime("%Y%m%d")
     
 
+class PathStep:
+    __slots__ = ("node_id", "name", "idx", "is_function", "is_anywhere")
+
+    def __init__(self, node_id: Optional[str], name: Optional[str], idx: Optional[int], is_function: bool, is_anywhere: bool) -> None:
+        self.node_id = node_id
+        self.name = name
+        # get_node_with_path()처럼 인덱스 0은 인덱스가 없는 것으로 취급
+        self.idx = idx if idx else None
+        self.is_function = is_function
+        self.is_anywhere = is_anywhere
+
+
+class PathQuery:
+    # 작업 스택에 쌓는 작업의 종류
+    _EVAL = 0
+    _EMIT = 1
+    _ID_FALLBACK = 2
+    _CHILDREN_NAMED = 3
+
+    def __init__(self, path_str: str, steps: List[PathStep]) -> None:
+        self.path_str = path_str
+        self.steps = steps
+
+    def run(self, node) -> List[Any]:
+        # HTMLExtractor.get_node_with_path()와 같은 노드를 같은 순서로 반환하되,
+        # 재귀 호출 대신 작업 스택을 사용하여 한 번의 순회로 처리함
+        result: List[Any] = []
+        if not node:
+            return result
+        # 진단 모드(-d)에서만 경로를 따라가는 과정을 기록함
+        is_tracing = logger.isEnabledFor(logging.DEBUG)
+        if is_tracing:
+            logger.debug("# PathQuery.run(node='%s', path_str='%s')", node.name, self.path_str)
+        num_steps = len(self.steps)
+        stack: List[Tuple[int, Any, Any]] = [(PathQuery._EVAL, node, 0)]
+        while stack:
+            kind, node, arg = stack.pop()
+            if kind == PathQuery._EMIT:
+                result.append(node)
+                continue
+            if kind == PathQuery._ID_FALLBACK:
+                # id로 찾은 노드 아래에서 아무것도 찾지 못했으면 id로 찾은 노드를 반환
+                if len(result) == arg:
+                    result.append(node)
+                continue
+            if kind == PathQuery._CHILDREN_NAMED:
+                for child in node.contents:
+                    if child.name is not None and child.name == arg:
+                        result.append(child)
+                continue
+
+            step = self.steps[arg]
+            is_last = arg + 1 == num_steps
+            if is_tracing:
+                logger.debug("step %d/%d at node='%s', node_id='%s', name='%s', idx=%d, is_function=%r, is_anywhere=%s", arg + 1, num_steps, node.name, step.node_id, step.name, step.idx if step.idx else -1, step.is_function, step.is_anywhere)
+            if step.node_id:
+                nodes = node.find_all(attrs={"id": step.node_id})
+                if len(nodes) != 1:
+                    if is_tracing:
+                        logger.debug("error, %s id matched", "no" if not nodes else "two or more")
+                    continue
+                if is_last:
+                    result.append(nodes[0])
+                else:
+                    stack.append((PathQuery._ID_FALLBACK, nodes[0], len(result)))
+                    stack.append((PathQuery._EVAL, nodes[0], arg + 1))
+                continue
+
+            if step.is_function and step.name == "text":
+                result.append(node.text)
+                continue
+
+            tasks: List[Tuple[int, Any, Any]] = []
+            i = 1
+            for child in node.contents:
+                if child.name is None:
+                    continue
+                if child.name == step.name:
+                    if not step.idx or i == step.idx:
+                        if is_last:
+                            tasks.append((PathQuery._EMIT, child, None))
+                        else:
+                            tasks.append((PathQuery._EVAL, child, arg + 1))
+                    if step.idx and i == step.idx:
+                        break
+                    i += 1
+                if step.is_anywhere:
+                    # '//'로 시작한 경우 각 자식 노드의 자식 중에서 이름이 같은 노드도 찾음
+                    tasks.append((PathQuery._CHILDREN_NAMED, child, step.name))
+            stack.extend(reversed(tasks))
+
+        if is_tracing:
+            logger.debug("%d nodes found with path_str='%s'", len(result), self.path_str)
+        return result
+
+
 class HTMLExtractor:
+    PATH_TOKEN_PATTERN = re.compile(r"""
+        (
+          (?P<name>\w+)
+          (?:
+          \[
+            (?P<idx>\d+)
+          \]
+          |
+          (?P<is_function>\(\))
+          )?
+        |
+          \*\[@id=\"(?P<id>\w+)\"\]
+        )
+        """, re.VERBOSE)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def compile_path(path_str: str) -> PathQuery:
+        # element_path를 한 번만 토큰으로 나누어 재사용 가능한 질의 계획으로 만듦
+        steps: List[PathStep] = []
+        remaining_path_str = path_str
+        while True:
+            if not remaining_path_str:
+                raise ValueError("invalid element path '%s'" % path_str)
+            token = HTMLExtractor.get_first_token_from_path(remaining_path_str)
+            if len(token) != 6 or not (token[0] or token[1]):
+                raise ValueError("invalid element path '%s'" % path_str)
+            node_id, name, idx, is_function, next_path_str, is_anywhere = token
+            steps.append(PathStep(node_id, name, idx, is_function, is_anywhere))
+            if next_path_str == "":
+                break
+            remaining_path_str = next_path_str
+        return PathQuery(path_str, steps)
+
     @staticmethod
     def get_first_token_from_path(path_str: str) -> Tuple[Optional[str], Optional[str], Optional[int], Optional[str], bool]:
         # print "get_first_token_from_path(path_str='%s')" % path_str
@@ -133,20 +279,7 @@ class HTMLExtractor:
                 break
 
         # 해당 토큰에 대해 정규식 매칭 시도
-        pattern = re.compile(r"""
-        (
-          (?P<name>\w+)
-          (?:
-          \[
-            (?P<idx>\d+)
-          \]
-          |
-          (?P<is_function>\(\))
-          )?
-        |
-          \*\[@id=\"(?P<id>\w+)\"\]
-        )
-        """, re.VERBOSE)
+        pattern = HTMLExtractor.PATH_TOKEN_PATTERN
         m = pattern.match(valid_token)
         if m:
             name = m.group("name")
@@ -161,52 +294,49 @@ class HTMLExtractor:
 
     @staticmethod
     def print_element(num, element):
-        print("%d" % num, end="")
-        if hasattr(element, "name"):
-            print(" %s" % element.name, end="")
-        if "id" in element:
-            print(" id=''" % element["id"], end="")
-        if "class" in element:
-            print(" id=''" % element["class"], end="")
-        print()
+        # 디버그 로그가 꺼져 있으면 문자열을 만들지 않음
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+        attrs = getattr(element, "attrs", None) or {}
+        logger.debug("%d %s%s%s", num, getattr(element, "name", None), " id='%s'" % attrs["id"] if "id" in attrs else "", " class='%s'" % attrs["class"] if "class" in attrs else "")
 
     @staticmethod
     def get_node_with_path(node, path_str: str) -> Optional[List[Any]]:
         if not node:
             return None
-        print("\n# get_node_with_path(node='%s', path_str='%s')" % (node.name, path_str))
+        logger.debug("# get_node_with_path(node='%s', path_str='%s')", node.name, path_str)
         node_list = []
 
         (node_id, name, idx, is_function, next_path_str, is_anywhere) = HTMLExtractor.get_first_token_from_path(path_str)
-        print("node_id='%s', name='%s', idx=%d, is_function=%r, next_path_str='%s', is_anywhere=%s" % (node_id, name, idx if idx else -1, is_function, next_path_str, is_anywhere))
+        logger.debug("node_id='%s', name='%s', idx=%d, is_function=%r, next_path_str='%s', is_anywhere=%s", node_id, name, idx if idx else -1, is_function, next_path_str, is_anywhere)
 
         if node_id:
-            print("searching with id")
+            logger.debug("searching with id")
             # 특정 id로 노드를 찾아서 현재 노드에 대입
             nodes = node.find_all(attrs={"id": node_id})
-            #print("nodes=", nodes)
+            #logger.debug("nodes=%s", nodes)
             if not nodes or nodes == []:
-                print("error, no id matched")
+                logger.debug("error, no id matched")
                 return None
             if len(nodes) > 1:
-                print("error, two or more id matched")
+                logger.debug("error, two or more id matched")
                 return None
-            print("found! node=%s" % nodes[0].name)
+            logger.debug("found! node=%s", nodes[0].name)
             node_list.append(nodes[0])
             result_node_list = HTMLExtractor.get_node_with_path(nodes[0], next_path_str)
             if result_node_list:
                 node_list = result_node_list
         else:
-            print("searching with name and index")
+            logger.debug("searching with name and index")
             if not name:
                 return None
 
             # 기본 함수
             if is_function and name == "text":
-                print("function")
+                logger.debug("function")
                 node_list.append(node.text)
             else:
-                print("#children=%d" % len(node.contents))
+                logger.debug("#children=%d", len(node.contents))
                 i = 1
                 for child in node.contents:
                     HTMLExtractor.print_element(i, child)
@@ -215,19 +345,19 @@ class HTMLExtractor:
                             continue
                         # 이름이 일치하거나 //로 시작한 경우
                         elif child.name == name:
-                            print("name matched! i=%d child.name='%s', type(child)=%s <--> name='%s', idx=%d" % (i, child.name, type(child), name, idx if idx else -1))
+                            logger.debug("name matched! i=%d child.name='%s', type(child)=%s <--> name='%s', idx=%d", i, child.name, type(child), name, idx if idx else -1)
                             if not idx or i == idx:
                                 # 인덱스가 지정되지 않았거나, 지정되었고 인덱스가 일치할 때
                                 if next_path_str == "":
                                     # 단말 노드이면 현재 일치한 노드를 반환
-                                    print("*** append! child='%s'" % child.name)
+                                    logger.debug("*** append! child='%s'", child.name)
                                     #logging.debug(child)
                                     node_list.append(child)
                                 else:
                                     # 중간 노드이면 recursion
-                                    print("*** recursion ***")
+                                    logger.debug("*** recursion ***")
                                     result_node_list = HTMLExtractor.get_node_with_path(child, next_path_str)
-                                    print("\n*** extend! #result_node_list=", len(result_node_list))
+                                    logger.debug("*** extend! #result_node_list=%d", len(result_node_list) if result_node_list else 0)
                                     if result_node_list:
                                         #logging.debug(result_node_list)
                                         node_list.extend(result_node_list)
@@ -236,11 +366,11 @@ class HTMLExtractor:
                             # 이름이 일치했을 때만 i를 증가시킴
                             i = i + 1
                         if is_anywhere:
-                            print("can be anywhere")
+                            logger.debug("can be anywhere")
                             result_node_list = HTMLExtractor.get_node_with_path(child, name)
                             if result_node_list:
                                 node_list.extend(result_node_list)
-                            #print("node_list=", node_list)
+                            #logger.debug("node_list=%s", node_list)
 
         return node_list
 
@@ -278,14 +408,18 @@ class IO:
         return line_list
 
 
+class ConfigError(Exception):
+    pass
+
+
 class Config:
     config: Dict[str, Dict[str, Any]] = {}
 
-    def __init__(self) -> None:
-        if "FEED_MAKER_CONF_FILE" in os.environ and os.environ["FEED_MAKER_CONF_FILE"]:
-            config_file = os.environ["FEED_MAKER_CONF_FILE"]
-        else:
-            config_file = "conf.xml"
+    def __init__(self, config_file: Optional[str] = None) -> None:
+        if not config_file:
+            config_file = Config.get_config_file_path()
+        import xmltodict
+
         with open(config_file, "r") as f:
             parsed_data = xmltodict.parse(f.read())
             if not parsed_data or "configuration" not in parsed_data:
@@ -294,6 +428,12 @@ class Config:
             else:
                 self.config = parsed_data["configuration"]
 
+    @staticmethod
+    def get_config_file_path() -> str:
+        if "FEED_MAKER_CONF_FILE" in os.environ and os.environ["FEED_MAKER_CONF_FILE"]:
+            return os.environ["FEED_MAKER_CONF_FILE"]
+        return "conf.xml"
+
     def _get_bool_config_value(self, config_node: Dict[str, Any], key: str, default: bool = False) -> bool:
         if key in config_node:
             if "true" == config_node[key]:
@@ -335,24 +475,278 @@ class Config:
             url_prefix = self._get_str_config_value(collection_conf, "url_prefix")
             user_agent = self._get_str_config_value(collection_conf, "user_agent")
             encoding = self._get_str_config_value(collection_conf, "encoding", "utf-8")
+            parser_engine = self._get_str_config_value(collection_conf, "parser_engine", "soup")
+            search_list_pattern = self._get_str_config_value(collection_conf, "search_list_pattern")
+            search_link_pattern = self._get_str_config_value(collection_conf, "search_link_pattern")
 
             list_url_list = self._get_config_value_list(collection_conf, "list_url", [])
             element_list = self._get_config_value_list(collection_conf, "element_list", [])
             element_id_list = self._get_config_value_list(collection_conf, "element_id", [])
             element_class_list = self._get_config_value_list(collection_conf, "element_class", [])
             element_path_list = self._get_config_value_list(collection_conf, "element_path", [])
+
+            sanitize_conf = collection_conf.get("sanitize") or {}
+            sanitize_default_rules = self._get_bool_config_value(sanitize_conf, "default_rules", False) if "default_rules" in sanitize_conf else True
+            sanitize_delete_chars = unescape_chars(self._get_str_config_value(sanitize_conf, "delete_chars") or "")
+            sanitize_rule_list = sanitize_conf.get("rule") or []
+            if not isinstance(sanitize_rule_list, list):
+                sanitize_rule_list = [sanitize_rule_list]
             conf = {
                 "url_prefix": url_prefix,
                 "user_agent": user_agent,
                 "encoding": encoding,
+                "parser_engine": parser_engine,
+                "search_list_pattern": search_list_pattern,
+                "search_link_pattern": search_link_pattern,
                 "list_url_list": list_url_list,
                 "element_list": element_list,
                 "element_id_list": element_id_list,
                 "element_class_list": element_class_list,
                 "element_path_list": element_path_list,
+                "sanitize_default_rules": sanitize_default_rules,
+                "sanitize_delete_chars": sanitize_delete_chars,
+                "sanitize_rule_list": sanitize_rule_list,
+            }
+        return conf
+
+    def get_cache_configs(self) -> Dict[str, Any]:
+        logger.debug("# get_cache_configs()")
+        conf: Dict[str, Any] = {}
+        if "cache" in self.config:
+            cache_conf = self.config["cache"]
+
+            enable = self._get_bool_config_value(cache_conf, "enable", False)
+            cache_dir = self._get_str_config_value(cache_conf, "cache_dir", ".cache")
+            ttl = int(self._get_str_config_value(cache_conf, "ttl", "86400"))
+            max_size = int(self._get_str_config_value(cache_conf, "max_size", "536870912"))
+            conf = {
+                "enable": enable,
+                "cache_dir": cache_dir,
+                "ttl": ttl,
+                "max_size": max_size,
+            }
+        return conf
+
+    def get_rate_limit_configs(self) -> Dict[str, Any]:
+        logger.debug("# get_rate_limit_configs()")
+        conf: Dict[str, Any] = {}
+        if "rate_limit" in self.config:
+            rate_limit_conf = self.config["rate_limit"]
+
+            enable = self._get_bool_config_value(rate_limit_conf, "enable", False)
+            requests_per_second = float(self._get_str_config_value(rate_limit_conf, "requests_per_second", "2"))
+            burst = float(self._get_str_config_value(rate_limit_conf, "burst", "1"))
+            min_requests_per_second = float(self._get_str_config_value(rate_limit_conf, "min_requests_per_second", "0.1"))
+            max_requests_per_second = float(self._get_str_config_value(rate_limit_conf, "max_requests_per_second", str(requests_per_second)))
+            conf = {
+                "enable": enable,
+                "requests_per_second": requests_per_second,
+                "burst": burst,
+                "min_requests_per_second": min_requests_per_second,
+                "max_requests_per_second": max_requests_per_second,
+            }
+        return conf
+
+    def get_retry_configs(self) -> Dict[str, Any]:
+        logger.debug("# get_retry_configs()")
+        conf: Dict[str, Any] = {}
+        if "retry" in self.config:
+            retry_conf = self.config["retry"]
+
+            max_attempts = int(self._get_str_config_value(retry_conf, "max_attempts", "3"))
+            backoff_base = float(self._get_str_config_value(retry_conf, "backoff_base", "0.5"))
+            backoff_max = float(self._get_str_config_value(retry_conf, "backoff_max", "30"))
+            retryable_status_codes = tuple(int(code) for code in self._get_str_config_value(retry_conf, "retryable_status_codes", "429,500,502,503,504").split(",") if code.strip())
+            retryable_exceptions = self._get_str_config_value(retry_conf, "retryable_exceptions", "ConnectionError,Timeout,ChunkedEncodingError")
+            failure_threshold = int(self._get_str_config_value(retry_conf, "failure_threshold", "5"))
+            reset_timeout = float(self._get_str_config_value(retry_conf, "reset_timeout", "30"))
+            conf = {
+                "max_attempts": max_attempts,
+                "backoff_base": backoff_base,
+                "backoff_max": backoff_max,
+                "retryable_status_codes": retryable_status_codes,
+                "retryable_exceptions": retryable_exceptions,
+                "failure_threshold": failure_threshold,
+                "reset_timeout": reset_timeout,
+            }
+        return conf
+
+    def get_result_store_configs(self) -> Dict[str, Any]:
+        logger.debug("# get_result_store_configs()")
+        conf: Dict[str, Any] = {}
+        if "result_store" in self.config:
+            result_store_conf = self.config["result_store"]
+
+            enable = self._get_bool_config_value(result_store_conf, "enable", False)
+            store_file = self._get_str_config_value(result_store_conf, "store_file", "results.db")
+            ttl = int(self._get_str_config_value(result_store_conf, "ttl", "0"))
+            conf = {
+                "enable": enable,
+                "store_file": store_file,
+                "ttl": ttl,
             }
         return conf
 
+    def get_job_queue_configs(self) -> Dict[str, Any]:
+        logger.debug("# get_job_queue_configs()")
+        conf: Dict[str, Any] = {}
+        if "job_queue" in self.config:
+            job_queue_conf = self.config["job_queue"]
+
+            backend = self._get_str_config_value(job_queue_conf, "backend", "sqlite")
+            queue_file = self._get_str_config_value(job_queue_conf, "queue_file", "jobs.db")
+            lease_seconds = float(self._get_str_config_value(job_queue_conf, "lease_seconds", "300"))
+            max_attempts = int(self._get_str_config_value(job_queue_conf, "max_attempts", "3"))
+            poll_interval = float(self._get_str_config_value(job_queue_conf, "poll_interval", "1"))
+            result_ttl = float(self._get_str_config_value(job_queue_conf, "result_ttl", "0"))
+            conf = {
+                "backend": backend,
+                "queue_file": queue_file,
+                "lease_seconds": lease_seconds,
+                "max_attempts": max_attempts,
+                "poll_interval": poll_interval,
+                "result_ttl": result_ttl,
+            }
+        return conf
+
+    def get_refresh_configs(self) -> Dict[str, Any]:
+        logger.debug("# get_refresh_configs()")
+        conf: Dict[str, Any] = {}
+        if "refresh" in self.config:
+            refresh_conf = self.config["refresh"]
+
+            enable = self._get_bool_config_value(refresh_conf, "enable", False)
+            store_file = self._get_str_config_value(refresh_conf, "store_file", "refresh.db")
+            use_head = self._get_bool_config_value(refresh_conf, "use_head", False)
+            conf = {
+                "enable": enable,
+                "store_file": store_file,
+                "use_head": use_head,
+            }
+        return conf
+
+
+@dataclass(frozen=True)
+class CollectionConfig:
+    url_prefix: str
+    user_agent: Optional[str]
+    encoding: str
+    parser_engine: str
+    search_list_pattern: Optional[str]
+    search_link_pattern: Optional[str]
+    # 첫번째 <element_list>의 (element_spec => 값) 읽기 전용 매핑
+    element_list: Mapping[str, Any]
+    # 추출하기 전에 HTML에 차례로 적용하는 (패턴, 치환) 규칙과 지울 문자 (<sanitize>의 기본 규칙 포함)
+    sanitize_rules: Tuple[Tuple[str, Replacement], ...] = DEFAULT_SANITIZE_RULES
+    sanitize_delete_chars: str = DEFAULT_DELETE_CHARS
+
+    PARSER_ENGINES = ("soup", "lxml")
+    ELEMENT_SPECS = ("element_class", "element_id", "element_path")
+
+    @staticmethod
+    def from_config(config: Config) -> "CollectionConfig":
+        conf = config.get_collection_configs()
+        if not conf:
+            raise ConfigError("no <collection> in configuration")
+        if not conf["url_prefix"]:
+            raise ConfigError("no <url_prefix> in <collection>")
+        if not conf["element_list"] or not isinstance(conf["element_list"][0], dict) or not conf["element_list"][0]:
+            raise ConfigError("no <element_list> in <collection>")
+        element_list = conf["element_list"][0]
+        for element_spec in element_list:
+            if element_spec not in CollectionConfig.ELEMENT_SPECS:
+                raise ConfigError("unknown configuration '%s' in <element_list>" % element_spec)
+        if conf["parser_engine"] not in CollectionConfig.PARSER_ENGINES:
+            raise ConfigError("unknown parser engine '%s'" % conf["parser_engine"])
+        try:
+            codecs.lookup(conf["encoding"])
+        except LookupError as e:
+            raise ConfigError("unknown encoding '%s'" % conf["encoding"]) from e
+        for key in ("search_list_pattern", "search_link_pattern"):
+            if conf[key]:
+                try:
+                    re.compile(conf[key])
+                except re.error as e:
+                    raise ConfigError("invalid <%s> '%s', %s" % (key, conf[key], e)) from e
+
+        sanitize_rules: List[Tuple[str, Replacement]] = list(DEFAULT_SANITIZE_RULES) if conf["sanitize_default_rules"] else []
+        for rule in conf["sanitize_rule_list"]:
+            if not isinstance(rule, dict) or not rule.get("pattern"):
+                raise ConfigError("no <pattern> in <sanitize><rule>")
+            try:
+                re.compile(rule["pattern"])
+            except re.error as e:
+                raise ConfigError("invalid <pattern> '%s' in <sanitize><rule>, %s" % (rule["pattern"], e)) from e
+            sanitize_rules.append((rule["pattern"], rule.get("replacement") or ""))
+        sanitize_delete_chars = (DEFAULT_DELETE_CHARS if conf["sanitize_default_rules"] else "") + conf["sanitize_delete_chars"]
+
+        return CollectionConfig(
+            url_prefix=conf["url_prefix"],
+            user_agent=conf["user_agent"],
+            encoding=conf["encoding"],
+            parser_engine=conf["parser_engine"],
+            search_list_pattern=conf["search_list_pattern"],
+            search_link_pattern=conf["search_link_pattern"],
+            element_list=MappingProxyType(dict(element_list)),
+            sanitize_rules=tuple(sanitize_rules),
+            sanitize_delete_chars=sanitize_delete_chars,
+        )
+
+    def get_fingerprint(self) -> str:
+        # 추출 결과에 영향을 주는 설정의 해시로, 설정이 바뀌면 저장된 추출 결과를 쓰지 않기 위해 사용함
+        data = {
+            "url_prefix": self.url_prefix,
+            "encoding": self.encoding,
+            "parser_engine": self.parser_engine,
+            "search_list_pattern": self.search_list_pattern,
+            "search_link_pattern": self.search_link_pattern,
+            "element_list": dict(self.element_list),
+            "sanitize_rules": [(pattern, get_replacement_name(replacement)) for pattern, replacement in self.sanitize_rules],
+            "sanitize_delete_chars": self.sanitize_delete_chars,
+        }
+        return hashlib.sha1(json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class _CollectionConfigCache:
+    # 설정 파일의 변경 여부(mtime)를 확인하는 최소 간격(초)
+    CHECK_INTERVAL = 1.0
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.config_file: Optional[str] = None
+        self.mtime: Optional[int] = None
+        self.last_checked_at = 0.0
+        self.collection_config: Optional[CollectionConfig] = None
+
+    def get(self) -> CollectionConfig:
+        config_file = Config.get_config_file_path()
+        now = time.monotonic()
+        collection_config = self.collection_config
+        if collection_config and config_file == self.config_file and now - self.last_checked_at < _CollectionConfigCache.CHECK_INTERVAL:
+            return collection_config
+
+        with self.lock:
+            try:
+                mtime = os.stat(config_file).st_mtime_ns
+            except OSError as e:
+                raise ConfigError("can't read config file '%s', %s" % (config_file, e)) from e
+            if not self.collection_config or config_file != self.config_file or mtime != self.mtime:
+                logger.debug("loading config file '%s'", config_file)
+                self.collection_config = CollectionConfig.from_config(Config(config_file))
+                self.config_file = config_file
+                self.mtime = mtime
+            self.last_checked_at = now
+            return self.collection_config
+
+
+_collection_config_cache = _CollectionConfigCache()
+
+
+def get_collection_config() -> CollectionConfig:
+    # 설정 파일은 한 번만 읽어서 검증하고, 파일이 바뀌었을 때만 다시 읽음
+    return _collection_config_cache.get()
+
+
 class URL:
     # http://naver.com/api/items?page_no=3 => http
     @staticmethod
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+
+
+import os
+import csv
+import logging
+from typing import List, Tuple, Iterator, Optional, Any
+
+
+logger = logging.getLogger()
+
+
+def get_file_type(file_path: str) -> str:
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext in (".xls", ".xlsx", ".csv"):
+        return ext[1:]
+    raise ValueError("unsupported file type '%s'" % file_path)
+
+
+def get_sheet_names(excel_file: str) -> List[str]:
+    file_type = get_file_type(excel_file)
+    if file_type == "xls":
+        import xlrd
+
+        workbook = xlrd.open_workbook(excel_file, on_demand=True)
+        try:
+            return workbook.sheet_names()
+        finally:
+            workbook.release_resources()
+    if file_type == "xlsx":
+        import openpyxl
+
+        workbook = openpyxl.load_workbook(excel_file, read_only=True)
+        try:
+            return list(workbook.sheetnames)
+        finally:
+            workbook.close()
+    return [os.path.splitext(os.path.basename(excel_file))[0]]
+
+
+def iter_rows(excel_file: str, sheet_index: int = 0) -> Iterator[Tuple[int, List[Any]]]:
+    # 워크북 전체를 복사하지 않고 한 행씩 (행 번호, 값 목록)을 반환
+    file_type = get_file_type(excel_file)
+    if file_type == "xls":
+        yield from _iter_xls_rows(excel_file, sheet_index)
+    elif file_type == "xlsx":
+        yield from _iter_xlsx_rows(excel_file, sheet_index)
+    else:
+        yield from _iter_csv_rows(excel_file)
+
+
+def get_num_rows(excel_file: str, sheet_index: int = 0) -> int:
+    # 행을 읽지 않고 시트의 행 수를 구하며, 행 수가 기록되지 않은 xlsx와 csv는 행을 세어봄
+    file_type = get_file_type(excel_file)
+    if file_type == "xls":
+        import xlrd
+
+        workbook = xlrd.open_workbook(excel_file, on_demand=True)
+        try:
+            return workbook.sheet_by_index(sheet_index).nrows
+        finally:
+            workbook.release_resources()
+    if file_type == "xlsx":
+        import openpyxl
+
+        workbook = openpyxl.load_workbook(excel_file, read_only=True)
+        try:
+            max_row = workbook.worksheets[sheet_index].max_row
+        finally:
+            workbook.close()
+        if max_row is not None:
+            return max_row
+    return sum(1 for _ in iter_rows(excel_file, sheet_index))
+
+
+def check_row_limit(excel_file: str, num_sheets: int, new_excel_file: str) -> None:
+    # 출력 파일이 xls인데 시트의 행이 xls의 한도보다 많으면 ValueError를 발생시킴
+    if get_file_type(new_excel_file) != "xls":
+        return
+    for sheet_index in range(num_sheets):
+        num_rows = get_num_rows(excel_file, sheet_index)
+        if num_rows > XlsWriter.MAX_ROWS:
+            raise ValueError("sheet %d of '%s' has %d rows, but xls supports up to %d rows; use .xlsx or .csv output" % (sheet_index, excel_file, num_rows, XlsWriter.MAX_ROWS))
+
+
+def _iter_xls_rows(excel_file: str, sheet_index: int) -> Iterator[Tuple[int, List[Any]]]:
+    import xlrd
+
+    # on_demand로 열면 요청한 시트만 읽어들이고, 다 읽은 뒤 시트를 해제함
+    workbook = xlrd.open_workbook(excel_file, on_demand=True)
+    try:
+        worksheet = workbook.sheet_by_index(sheet_index)
+        for row_num in range(worksheet.nrows):
+            yield row_num, worksheet.row_values(row_num)
+        workbook.unload_sheet(sheet_index)
+    finally:
+        workbook.release_resources()
+
+
+def _iter_xlsx_rows(excel_file: str, sheet_index: int) -> Iterator[Tuple[int, List[Any]]]:
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(excel_file, read_only=True, data_only=True)
+    try:
+        worksheet = workbook.worksheets[sheet_index]
+        for row_num, values in enumerate(worksheet.iter_rows(values_only=True)):
+            yield row_num, ["" if value is None else value for value in values]
+    finally:
+        workbook.close()
+
+
+def _iter_csv_rows(csv_file: str) -> Iterator[Tuple[int, List[Any]]]:
+    with open(csv_file, "r", newline="", encoding="utf-8-sig") as f:
+        for row_num, values in enumerate(csv.reader(f)):
+            yield row_num, values
+
+
+class RowWriter:
+    def __enter__(self) -> "RowWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def add_sheet(self, sheet_name: str) -> None:
+        # 이후의 write_row()는 새 시트에 씀
+        raise NotImplementedError
+
+    def write_row(self, row_num: int, row: List[Any]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        raise NotImplementedError
+
+
+class XlsWriter(RowWriter):
+    # xls(BIFF8) 형식의 시트당 최대 행 수
+    MAX_ROWS = 65536
+    FLUSH_INTERVAL = 1000
+
+    def __init__(self, file_path: str, sheet_name: str = "Sheet1") -> None:
+        import xlwt
+
+        self.file_path = file_path
+        self.workbook = xlwt.Workbook()
+        self.worksheet = self.workbook.add_sheet(sheet_name, cell_overwrite_ok=True)
+        self.num_written_rows = 0
+
+    def add_sheet(self, sheet_name: str) -> None:
+        self.worksheet.flush_row_data()
+        self.worksheet = self.workbook.add_sheet(sheet_name, cell_overwrite_ok=True)
+        self.num_written_rows = 0
+
+    def write_row(self, row_num: int, row: List[Any]) -> None:
+        if row_num >= XlsWriter.MAX_ROWS:
+            raise ValueError("can't write row %d to '%s', xls supports up to %d rows; use .xlsx or .csv output" % (row_num, self.file_path, XlsWriter.MAX_ROWS))
+        for col_num in range(len(row)):
+            self.worksheet.write(row_num, col_num, row[col_num])
+        self.num_written_rows += 1
+        # 주기적으로 행 객체를 직렬화된 데이터로 바꿔 메모리 사용량을 줄임
+        if self.num_written_rows % XlsWriter.FLUSH_INTERVAL == 0:
+            self.worksheet.flush_row_data()
+
+    def close(self) -> None:
+        self.workbook.save(self.file_path)
+
+
+class XlsxWriter(RowWriter):
+    def __init__(self, file_path: str, sheet_name: str = "Sheet1") -> None:
+        import openpyxl
+
+        self.file_path = file_path
+        # write_only 모드는 행을 바로 임시 파일로 내보내므로 메모리 사용량이 일정함
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.worksheet = self.workbook.create_sheet(sheet_name)
+        self.next_row_num = 0
+
+    def add_sheet(self, sheet_name: str) -> None:
+        self.worksheet = self.workbook.create_sheet(sheet_name)
+        self.next_row_num = 0
+
+    def write_row(self, row_num: int, row: List[Any]) -> None:
+        # write_only 모드는 순차적으로만 쓸 수 있으므로 빠진 행은 빈 행으로 채움
+        while self.next_row_num < row_num:
+            self.worksheet.append([])
+            self.next_row_num += 1
+        self.worksheet.append(row)
+        self.next_row_num += 1
+
+    def close(self) -> None:
+        self.workbook.save(self.file_path)
+
+
+class CsvWriter(RowWriter):
+    def __init__(self, file_path: str) -> None:
+        self.file_path = file_path
+        self.outfile = open(file_path, "w", newline="", encoding="utf-8-sig")
+        self.writer = csv.writer(self.outfile)
+        self.next_row_num = 0
+
+    def add_sheet(self, sheet_name: str) -> None:
+        # CSV는 시트를 가질 수 없으므로 시트마다 '<파일명>.<시트명>.csv' 파일을 만듦
+        self.outfile.close()
+        base, ext = os.path.splitext(self.file_path)
+        self.outfile = open("%s.%s%s" % (base, sheet_name, ext), "w", newline="", encoding="utf-8-sig")
+        self.writer = csv.writer(self.outfile)
+        self.next_row_num = 0
+
+    def write_row(self, row_num: int, row: List[Any]) -> None:
+        while self.next_row_num < row_num:
+            self.writer.writerow([])
+            self.next_row_num += 1
+        self.writer.writerow(row)
+        self.next_row_num += 1
+
+    def close(self) -> None:
+        self.outfile.close()
+
+
+def make_writer(file_path: str, sheet_name: str = "Sheet1") -> RowWriter:
+    file_type = get_file_type(file_path)
+    if file_type == "xls":
+        return XlsWriter(file_path, sheet_name)
+    if file_type == "xlsx":
+        return XlsxWriter(file_path, sheet_name)
+    return CsvWriter(file_path)